@@ -0,0 +1,169 @@
+"""Run Scrappy's batch pipeline (main.run) end to end against the local mock server.
+
+Each scenario starts benchmarks/mock_server.py in its own process and runs Scrappy in
+another, reporting throughput, the time to the first written row and Scrappy's peak RSS. Save a run with --save
+and pass it as --baseline later to fail on throughput or memory regressions.
+
+Usage: python benchmarks/bench_end_to_end.py [--scenarios small,medium,large] [--latency 0.005]
+       [--error-rate 0.0] [--save results.json] [--baseline results.json]
+"""
+import argparse
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+# Make the Scrappy packages importable when run from anywhere
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_FOLDER not in sys.path:
+    sys.path.insert(0, ROOT_FOLDER)
+
+BENCHMARKS_FOLDER = os.path.join(ROOT_FOLDER, "benchmarks")
+SCENARIOS = {"small": 10, "medium": 1000, "large": 50000}
+# The mock server is local, so skip the politeness delay and keep runs independent of earlier ones
+CHILD_ENVIRONMENT = {"SCRAPPY_POLITENESS_DELAY": "0", "SCRAPPY_CACHE": "off", "SCRAPPY_STORE": "off"}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(args):
+    """Scrape the mock server at `args.url` and print the scenario result as JSON."""
+    sys.path.insert(0, BENCHMARKS_FOLDER)
+    import main as scrappy
+    from locales import SUPPORTED_LOCALES
+    from mock_server import owner_name
+
+    SUPPORTED_LOCALES["benchmark"] = {"name": "Benchmark", "url": args.url}
+    owners = [owner_name(owner) for owner in range((args.parcels + args.per_owner - 1) // args.per_owner)]
+    first_row = []
+
+    def on_event(event):
+        if event["event"] == "property_written" and not first_row:
+            first_row.append(time.perf_counter())
+
+    with tempfile.TemporaryDirectory() as folder, open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        scrappy.PDF_FOLDER = os.path.join(folder, "pdfs")
+        os.makedirs(scrappy.PDF_FOLDER)
+        summary_path = os.path.join(folder, "summary.json")
+        run_args = scrappy.parse_args([
+            "--owners", ";".join(owners), "--locale", "benchmark", "--tax-year", "2024",
+            "--workers", str(args.workers), "--fuzzy", "reject", "--quiet",
+            "--output", os.path.join(folder, "output.xlsx"), "--summary-json", summary_path,
+            "--metrics-json", os.path.join(folder, "metrics.json"),
+            "--checkpoint", os.path.join(folder, "checkpoint.jsonl"),
+            "--error-log", os.path.join(folder, "errors.log"),
+        ])
+        started = time.perf_counter()
+        scrappy.run(run_args, on_event=on_event)
+        finished = time.perf_counter()
+        with open(summary_path) as handle:
+            summary = json.load(handle)
+
+    print(json.dumps({
+        "parcels": summary["properties"],
+        "errors": len(summary["errors"]),
+        "first_row_seconds": (first_row[0] if first_row else finished) - started,
+        "total_seconds": finished - started,
+        "parcels_per_second": summary["properties"] / max(finished - started, 1e-9),
+        "megabytes": summary["throughput"]["bytes"] / (1024 * 1024),
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def run_scenario(name, parcels, args):
+    """Start a mock server, run Scrappy against it in a fresh process and return the parsed result."""
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BENCHMARKS_FOLDER, "mock_server.py"), "--parcels", str(parcels),
+         "--per-owner", str(args.per_owner), "--latency", str(args.latency), "--error-rate", str(args.error_rate),
+         "--port", str(port)],
+        stdout=subprocess.PIPE, text=True)
+    try:
+        server.stdout.readline()  # "Serving ..." once the socket is listening
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", "--url", f"http://127.0.0.1:{port}",
+             "--parcels", str(parcels), "--per-owner", str(args.per_owner), "--workers", str(args.workers)],
+            check=True, capture_output=True, text=True, env=dict(os.environ, **CHILD_ENVIRONMENT)).stdout
+    finally:
+        server.terminate()
+        server.wait()
+    return dict(json.loads(output.strip().splitlines()[-1]), scenario=name)
+
+
+def find_regressions(results, baseline, tolerance):
+    """Return messages for scenarios that got slower or bigger than `baseline` by more than `tolerance`."""
+    previous = {result["scenario"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(result["scenario"])
+        if not before:
+            continue
+        if result["parcels_per_second"] < before["parcels_per_second"] * (1 - tolerance):
+            regressions.append(f"{result['scenario']}: {result['parcels_per_second']:.1f} parcels/s, "
+                               f"was {before['parcels_per_second']:.1f}")
+        if result["peak_rss_mb"] > before["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: peak RSS {result['peak_rss_mb']:.1f} MB, "
+                               f"was {before['peak_rss_mb']:.1f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated scenarios to run ({', '.join(f'{k}={v}' for k, v in SCENARIOS.items())} parcels).")
+    parser.add_argument("--per-owner", type=int, default=50, help="Parcels owned by each synthetic owner.")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.005, help="Mean seconds the mock server adds per response.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of responses that are HTTP 500.")
+    parser.add_argument("--save", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Results JSON from an earlier run to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed slowdown or memory growth against the baseline (default: 0.2 = 20%%).")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    parser.add_argument("--parcels", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args)
+        return
+
+    results = []
+    for name in filter(None, (part.strip() for part in args.scenarios.split(","))):
+        if name not in SCENARIOS:
+            parser.error(f"Unknown scenario {name!r}. Choose from: {', '.join(SCENARIOS)}")
+        result = run_scenario(name, SCENARIOS[name], args)
+        results.append(result)
+        print(f"{name:<7} {result['parcels']:>6} parcels in {result['total_seconds']:7.1f}s "
+              f"({result['parcels_per_second']:7.1f}/s; first row after {result['first_row_seconds']:.2f}s)   "
+              f"{result['megabytes']:.1f} MB fetched   peak RSS {result['peak_rss_mb']:.1f} MB   "
+              f"{result['errors']} errors")
+
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump(results, handle, indent=2)
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = find_regressions(results, json.load(handle), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare printing progress lines directly with emitting them through the event stream.
+
+Each mode reports a page_fetched line for every row from several scraper threads, the
+way the search workers do. "caller" is the time the scraper threads spend reporting;
+"drained" includes the writer thread finishing the output.
+Output goes to stdout; --write-latency makes every write to it take that long, like a slow
+console (Windows consoles often take tens of microseconds per write).
+Usage: python benchmarks/bench_events.py [--events 100000] [--threads 4] [--write-latency 0.00005] > /dev/null
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+# Make the Scrappy packages importable when run from anywhere
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_FOLDER not in sys.path:
+    sys.path.insert(0, ROOT_FOLDER)
+
+from utils.events import EventStream
+
+
+class SlowStream:
+    """Wrap a stream so each write blocks for `latency` seconds, as terminal I/O does."""
+
+    def __init__(self, stream, latency):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, text):
+        time.sleep(self.latency)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def run_threads(report, count, threads):
+    def work(offset):
+        for index in range(offset, count, threads):
+            report(index)
+
+    workers = [threading.Thread(target=work, args=(offset,)) for offset in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def bench_print(count, threads, stream):
+    def report(index):
+        print(f"Searching for owner: OWNER {index % 97:05d} HOLDINGS, Page: {index}", file=stream, flush=True)
+
+    caller = run_threads(report, count, threads)
+    return caller, caller
+
+
+def bench_events(count, threads, output):
+    stream = EventStream(stream=output)
+
+    def report(index):
+        stream.emit("page_fetched", owner=f"OWNER {index % 97:05d} HOLDINGS", locale="davidson-tn",
+                    tax_year="2024", page=index, status=200, bytes=18000)
+
+    started = time.perf_counter()
+    caller = run_threads(report, count, threads)
+    stream.close()
+    return caller, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--write-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    output = SlowStream(sys.stdout, args.write_latency) if args.write_latency else sys.stdout
+    results = {}
+    for mode, bench in [("print", bench_print), ("events", bench_events)]:
+        results[mode] = bench(args.events, args.threads, output)
+    # The results go to stderr, so they stay readable when stdout is redirected
+    for mode, (caller, drained) in results.items():
+        sys.stderr.write(f"{mode:<7} caller {caller:6.2f}s ({caller / args.events * 1e6:6.2f} us/event)   "
+                         f"drained {drained:6.2f}s\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Measure time and peak RSS of the in-memory and streaming Excel writers.
+
+Each mode runs in its own subprocess so peak RSS is not shared between them.
+Usage: python benchmarks/bench_excel.py [--rows 100000]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Make the Scrappy packages importable when run from anywhere
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_FOLDER not in sys.path:
+    sys.path.insert(0, ROOT_FOLDER)
+
+import openpyxl
+from outputs.excel_writer import HEADERS, ExcelStreamWriter, build_row
+
+
+def synthetic_rows(count):
+    """Yield property dicts shaped like the scraper's output."""
+    for index in range(count):
+        yield {
+            "Input Name": "Smith John",
+            "Matched Name": f"SMITH JOHN {index % 97}",
+            "Address": f"{index} Main St",
+            "Account": f"{10000000 + index}",
+            "Year": "2024",
+            "Locale": "davidson-tn",
+            "Parcel": f"071 12 0 {index}.00",
+            "Improvement Value": f"${100000 + index:,}",
+            "Land Value": "$50,000",
+            "Personal Property Value": "$0",
+            "Assessment Rate": "25",
+            "Tax Rate": "3.254",
+        }
+
+
+def write_in_memory(rows, filename):
+    """The previous writer: a regular workbook that holds every cell until save()."""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "enter data"
+    sheet.append(HEADERS)
+    for row_index, item in enumerate(rows, start=2):
+        sheet.append(build_row(item, row_index))
+    workbook.save(filename)
+
+
+def write_streaming(rows, filename):
+    with ExcelStreamWriter(filename) as writer:
+        for item in rows:
+            writer.append(item)
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(mode, rows):
+    writer = write_in_memory if mode == "in-memory" else write_streaming
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "bench.xlsx")
+        started = time.perf_counter()
+        writer(synthetic_rows(rows), filename)
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(filename)
+    print(json.dumps({"mode": mode, "seconds": elapsed, "peak_rss_mb": peak_rss_mb(), "file_mb": size / (1024 * 1024)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--child", choices=["in-memory", "streaming"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args.child, args.rows)
+        return
+
+    print(f"Writing {args.rows:,} synthetic rows")
+    for mode in ["in-memory", "streaming"]:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, "--rows", str(args.rows)],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<10} {result['seconds']:7.1f}s   peak RSS {result['peak_rss_mb']:7.1f} MB   "
+              f"file {result['file_mb']:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare the original per-row matching path with the batched name matcher.
+
+A search page is matched against the one owner name searched for, or the few input names
+of a merged search, so --inputs defaults to 1; larger values show how the batch scales.
+Usage: python benchmarks/bench_matching.py [--inputs 1] [--pages 2000] [--rows 50]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Make the Scrappy packages importable when run from anywhere
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_FOLDER not in sys.path:
+    sys.path.insert(0, ROOT_FOLDER)
+
+from rapidfuzz.fuzz import partial_ratio
+from scrapers.name_matcher import cached_normalize, match_names
+from utils.normalizer import normalize_text
+
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Wilson", "Moore",
+              "Taylor", "Anderson", "Thomas", "Jackson", "White", "Harris", "Martin", "Thompson", "Young", "King"]
+FIRST_NAMES = ["James", "Mary", "John", "Linda", "Robert", "Susan", "Michael", "Karen", "David", "Nancy"]
+SUFFIXES = ["", "", "", " Trustee", " Etux", " LLC", " Revocable Trust", " Jr"]
+
+
+def synthetic_names(rng, count):
+    return [f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)}{rng.choice(SUFFIXES)}".upper() for _ in range(count)]
+
+
+def confirm_match(input_name, matched_name, threshold=80):
+    """The original per-pair check: True for an exact match, None for a borderline one, else False."""
+    normalized_input = normalize_text(input_name)
+    normalized_matched = normalize_text(matched_name)
+    if normalized_input == normalized_matched:
+        return True
+    if partial_ratio(normalized_input, normalized_matched) >= threshold:
+        return None
+    return False
+
+
+def per_row(input_names, pages):
+    """The original path: two normalizations and one partial_ratio per row, per input name."""
+    matched = 0
+    for input_name in input_names:
+        for page in pages:
+            for owner in page:
+                matched += confirm_match(input_name, owner) is True
+    return matched
+
+
+def batched(input_names, pages):
+    """The batched path: each page's owner column scored against all input names at once."""
+    matched = 0
+    for page in pages:
+        for row_matches in match_names(input_names, page):
+            matched += sum(1 for _, exact in row_matches if exact)
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--inputs", type=int, default=1)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    input_names = [name.title() for name in synthetic_names(rng, args.inputs)]
+    pages = [synthetic_names(rng, args.rows) for _ in range(args.pages)]
+    comparisons = args.inputs * args.pages * args.rows
+    print(f"{args.inputs} input names x {args.pages} pages x {args.rows} rows = {comparisons:,} comparisons")
+
+    started = time.perf_counter()
+    expected = per_row(input_names, pages)
+    per_row_seconds = time.perf_counter() - started
+
+    cached_normalize.cache_clear()
+    started = time.perf_counter()
+    actual = batched(input_names, pages)
+    batched_seconds = time.perf_counter() - started
+
+    print(f"per-row matching:      {per_row_seconds:8.3f}s ({comparisons / per_row_seconds:,.0f} comparisons/s)")
+    print(f"batched match_names:   {batched_seconds:8.3f}s ({comparisons / batched_seconds:,.0f} comparisons/s)")
+    print(f"speedup: {per_row_seconds / batched_seconds:.1f}x, exact matches agree: {expected == actual}")
+
+
+if __name__ == "__main__":
+    main()
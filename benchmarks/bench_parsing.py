@@ -0,0 +1,85 @@
+"""Compare per-page parse CPU time of the original html.parser path with the fast parsing path.
+
+Usage: python benchmarks/bench_parsing.py [--iterations 200] [--parser lxml]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Make the Scrappy packages importable when run from anywhere
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_FOLDER not in sys.path:
+    sys.path.insert(0, ROOT_FOLDER)
+
+from bs4 import BeautifulSoup
+from scrapers.detail_scraper import DETAIL_LABELS
+from utils import html_parsing
+
+FIXTURES_FOLDER = os.path.join(ROOT_FOLDER, "benchmarks", "fixtures")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_FOLDER, name), encoding="utf-8") as handle:
+        return handle.read()
+
+
+def search_original(html):
+    """The original path: a full html.parser soup walked with find/find_all."""
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find("table", id="data")
+    rows = []
+    for row in table.find_all("tr", class_="odd"):
+        cells = row.find_all("td")
+        link = cells[-1].find("a")
+        rows.append(([cell.text.strip() for cell in cells], link["href"] if link else None))
+    return rows, soup.find("a", string="Next") is not None
+
+
+def search_fast(html):
+    page = html_parsing.extract_search_page(html)
+    rows = [(row["cells"], row["link"]) for row in page["rows"]]
+    return rows, page["next"]
+
+
+def detail_original(html):
+    """The original path: one full-soup find per label."""
+    soup = BeautifulSoup(html, "html.parser")
+    return {label: soup.find("td", string=label).find_next("td").text.strip() for label in DETAIL_LABELS}
+
+
+def detail_fast(html):
+    return html_parsing.extract_labeled_values(html, DETAIL_LABELS)
+
+
+def cpu_ms_per_page(func, html, iterations):
+    started = time.process_time()
+    for _ in range(iterations):
+        func(html)
+    return (time.process_time() - started) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--parser", help="Backend for the fast path (default: lxml when installed).")
+    args = parser.parse_args()
+    if args.parser:
+        html_parsing.DEFAULT_PARSER = args.parser
+
+    print(f"fast path backend: {html_parsing.parser_for()}")
+    # A blank 200 response is a page without results, not an error
+    for blank in ["", "  \n"]:
+        assert html_parsing.extract_search_page(blank) == {"table": False, "rows": [], "next": False}
+        assert html_parsing.extract_labeled_values(blank, DETAIL_LABELS) == {}
+    for name, original, fast in [("search_results.html", search_original, search_fast),
+                                 ("detail_page.html", detail_original, detail_fast)]:
+        html = read_fixture(name)
+        assert original(html) == fast(html), f"fast path disagrees with the original on {name}"
+        before = cpu_ms_per_page(original, html, args.iterations)
+        after = cpu_ms_per_page(fast, html, args.iterations)
+        print(f"{name:<22} original {before:7.2f} ms/page   fast {after:7.2f} ms/page   ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Compare per-row dicts with PropertyRecord for building, holding and writing scraped properties.
+
+Each mode builds every property the way the scraper does (a parsed search row, then the
+detail page fields), keeps them all in a list, and then turns each into an Excel row and a typed
+row. Memory is the Python heap held by the list, measured with tracemalloc.
+Usage: python benchmarks/bench_records.py [--rows 100000]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+# Make the Scrappy packages importable when run from anywhere
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_FOLDER not in sys.path:
+    sys.path.insert(0, ROOT_FOLDER)
+
+from locales import SUPPORTED_LOCALES
+from outputs.excel_writer import build_row
+from outputs.writers import build_typed_row
+from scrapers.property_scraper import parse_table_row
+from utils.property_record import parse_number
+
+LOCALE = "davidson-tn"
+
+
+def search_row(index):
+    """A search result row as extract_search_page returns it."""
+    return {
+        "cells": ["", f"SMITH JOHN {index % 97}", f"{index} Main St", f"{10000000 + index}", "2024", "$1,200.00"],
+        "link": f"mod.php?mod=propertytax&mode=details&id={index}&x=1",
+    }
+
+
+def dict_row(row, locale):
+    """The previous parse_table_row, which built a free-form dict per row."""
+    cells = row["cells"]
+    link_suffix = row["link"]
+    full_link = f"{SUPPORTED_LOCALES[locale]['url']}/{link_suffix}"
+    id_value = link_suffix.split("id=")[1].split("&")[0]
+    pdf_link = f"{SUPPORTED_LOCALES[locale]['url']}/mod.php?mod=propertytax&mode=PDFBill&viewtype=public&bill[]={id_value}&show_ocr=1"
+    return {
+        "Matched Name": cells[1], "Address": cells[2], "Account": cells[3], "Year": cells[4], "Locale": locale,
+        "Link": full_link, "PDF Link": pdf_link,
+    }
+
+
+def detail_text(index):
+    """Detail fields as scraped text, which the dict path kept until write time.
+
+    Every value is a new string, as it is when it comes out of a parsed page.
+    """
+    return {
+        "Parcel": f"071 12 0 {index}.00",
+        "Improvement Value": f"${100000 + index:,}",
+        "Land Value": f"${50000 + index % 10 * 1000:,}",
+        "Personal Property Value": f"${index % 3}",
+        "Assessment Rate": f"{25 + index % 2 * 15}",
+        "Tax Rate": f"3.{254 + index % 10}",
+    }
+
+
+def detail_numbers(index):
+    """The same fields as scrape_details now returns them, parsed once."""
+    return {key: value if key == "Parcel" else parse_number(value) for key, value in detail_text(index).items()}
+
+
+def build_dicts(count):
+    properties = []
+    for index in range(count):
+        property = dict({"Input Name": "Smith John"}, **dict_row(search_row(index), LOCALE))
+        property.update(detail_text(index))
+        properties.append(property)
+    return properties
+
+
+def build_records(count):
+    properties = []
+    for index in range(count):
+        property = parse_table_row(search_row(index), LOCALE)
+        property.input_name = "Smith John"
+        property.update(detail_numbers(index))
+        property.position = index + 1
+        properties.append(property)
+    return properties
+
+
+def run(mode, count):
+    build = build_dicts if mode == "dict" else build_records
+    gc.collect()
+    tracemalloc.start()
+    properties = build(count)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del properties
+    gc.collect()
+
+    # Timed again without tracemalloc, which slows allocation down
+    started = time.perf_counter()
+    properties = build(count)
+    built = time.perf_counter()
+    started_rows = time.perf_counter()
+    for row_index, property in enumerate(properties, start=2):
+        build_row(property, row_index)
+        build_typed_row(property)
+    finished = time.perf_counter()
+    return {"build_seconds": built - started, "row_seconds": finished - started_rows, "held_mb": held / (1024 * 1024)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"Building and writing {args.rows:,} properties")
+    for mode in ["dict", "record"]:
+        result = run(mode, args.rows)
+        print(f"{mode:<7} build {result['build_seconds']:6.2f}s   rows {result['row_seconds']:6.2f}s   "
+              f"held {result['held_mb']:7.1f} MB ({result['held_mb'] * 1024 * 1024 / args.rows:,.0f} bytes/property)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Local stand-in for a MyGovOnline county site, for offline benchmarks.
+
+Search, detail and PDF responses replay the recorded pages in benchmarks/fixtures with
+synthetic parcels filled in. Latency and HTTP 500 errors can be injected.
+
+Usage: python benchmarks/mock_server.py [--parcels 1000] [--port 8765] [--latency 0.02] [--error-rate 0.01]
+"""
+import argparse
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+FIRST_BILL_ID = 100000
+FIRST_ACCOUNT = 10000000
+STREETS = ["MAIN ST", "OAK ST", "CHURCH ST", "ELM DR", "CEDAR LN", "MILL RD"]
+NEXT_LINK = '<a href="#">Next</a>'
+DETAIL_VALUES = {
+    "Parcel:": lambda index: f"{index // 1000:03d} {index % 1000 // 10:02d} 0 {index:06d}.00",
+    "Improvement Value:": lambda index: f"${100000 + index * 7 % 400000:,}",
+    "Land Value:": lambda index: f"${20000 + index * 13 % 90000:,}",
+    "Personal Property Value:": lambda index: "$0",
+    "Taxable Property:": lambda index: "25% x",
+    "2024 Tax Rate:": lambda index: "3.254",
+}
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_FOLDER, name), encoding="utf-8") as handle:
+        return handle.read()
+
+
+def split_search_fixture(html):
+    """Split the recorded search page into (head, row template, tail) around its result rows.
+
+    The row template is the first recorded row with its values replaced by {owner},
+    {address}, {account}, {year}, {amount} and {bill} placeholders.
+    """
+    first = html.index('<tr class="odd">')
+    end = html.index("</table>", first)
+    row = html[first:html.index("</tr>", first) + len("</tr>")]
+    cells = re.findall(r"<td>(.*?)</td>", row, re.S)
+    bill = re.search(r'value="(\d+)"', cells[0]).group(1)
+    template = row.replace("{", "{{").replace("}", "}}")
+    for value, placeholder in [(cells[1], "{owner}"), (cells[2], "{address}"), (cells[3], "{account}"),
+                               (cells[5], "{amount}"), (bill, "{bill}"), (cells[4], "{year}")]:
+        template = template.replace(value, placeholder)
+    return html[:first], template, html[end:]
+
+
+def owner_name(owner):
+    return f"OWNER {owner:05d} HOLDINGS"
+
+
+class MockCountyServer:
+    """A threaded HTTP server with `parcels` parcels spread over owners of `per_owner` parcels each."""
+
+    def __init__(self, parcels=1000, per_owner=50, per_page=25, latency=0.0, error_rate=0.0, pdf_size=2048,
+                 port=0, seed=0):
+        self.parcels = parcels
+        self.per_owner = max(1, per_owner)
+        self.per_page = max(1, per_page)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.pdf_size = pdf_size
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._head, self._row, self._tail = split_search_fixture(read_fixture("search_results.html"))
+        self._detail = read_fixture("detail_page.html")
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def owner_names(self):
+        owners = (self.parcels + self.per_owner - 1) // self.per_owner
+        return [owner_name(owner) for owner in range(owners)]
+
+    def search_page(self, name, page):
+        match = re.fullmatch(r"owner (\d+) holdings", name.strip().lower())
+        start = int(match.group(1)) * self.per_owner if match else self.parcels
+        stop = min(start + self.per_owner, self.parcels)
+        first = start + (page - 1) * self.per_page
+        last = min(first + self.per_page, stop)
+        rows = "\n".join(
+            self._row.format(owner=owner_name(index // self.per_owner), address=f"{index % 9000 + 100} "
+                             f"{STREETS[index % len(STREETS)]}", account=FIRST_ACCOUNT + index, year="2024",
+                             amount=f"${index % 5000 + 500}.00", bill=FIRST_BILL_ID + index)
+            for index in range(first, last)
+        )
+        tail = self._tail if last < stop else self._tail.replace(NEXT_LINK, "")
+        return f"{self._head}{rows}\n{tail}"
+
+    def detail_page(self, index):
+        html = self._detail
+        for label, value in DETAIL_VALUES.items():
+            html = html.replace(f"<td>{label}</td><td>", f"<td>{label}</td><td>{value(index)}\x00", 1)
+        return re.sub("\x00[^<]*", "", html)
+
+    def pdf_body(self, bill):
+        """Return a distinct PDF-looking body of about `pdf_size` bytes for each bill."""
+        head = f"%PDF-1.4\n% bill {bill}\n".encode("ascii")
+        return head + b"0" * max(0, self.pdf_size - len(head) - 7) + b"\n%%EOF\n"
+
+    def _wait(self):
+        """Sleep for the injected latency (+/-50% jitter) and decide whether to fail this request."""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency * self._random.uniform(0.5, 1.5)
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        return failed
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = parse_qs(self.rfile.read(length).decode("utf-8"))
+                if server._wait():
+                    return self._send(500, b"Internal Server Error")
+                html = server.search_page(form.get("owner_name", [""])[0], int(form.get("page", ["1"])[0]))
+                self._send(200, html.encode("utf-8"))
+
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                if server._wait():
+                    return self._send(500, b"Internal Server Error")
+                if query.get("mode") == ["PDFBill"]:
+                    return self._send(200, server.pdf_body(query.get("bill[]", [""])[0]), "application/pdf")
+                bill = query.get("id", [""])[0]
+                if not bill.isdigit() or not 0 <= int(bill) - FIRST_BILL_ID < server.parcels:
+                    return self._send(404, b"Not Found")
+                self._send(200, server.detail_page(int(bill) - FIRST_BILL_ID).encode("utf-8"))
+
+            def _send(self, status, body, content_type="text/html; charset=utf-8"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parcels", type=int, default=1000)
+    parser.add_argument("--per-owner", type=int, default=50, help="Parcels owned by each synthetic owner.")
+    parser.add_argument("--per-page", type=int, default=25, help="Search results per page.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean seconds added to every response.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500.")
+    parser.add_argument("--pdf-size", type=int, default=2048, help="Size of each PDF in bytes.")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = MockCountyServer(args.parcels, args.per_owner, args.per_page, args.latency, args.error_rate,
+                              args.pdf_size, args.port)
+    print(f"Serving {args.parcels} parcels for {len(server.owner_names)} owners on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
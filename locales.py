@@ -1,3 +1,5 @@
+# Each locale may add a "rate_limit" dict overriding utils.fetch_engine.DEFAULT_HOST_SETTINGS
+# for its host, e.g. {"rate": 2, "max_rate": 6, "concurrency": 2, "failure_threshold": 3}
 SUPPORTED_LOCALES = {
     "davidson-tn": {
         "url": "https://nashville-tn.mygovonline.com",
@@ -1,7 +1,9 @@
 import os
 import sys
 import json
-import requests
+import argparse
+import itertools
+import threading
 from termcolor import colored
 
 # Ensure `scrappy` is in the Python path dynamically
@@ -9,16 +11,36 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
+from utils.startup import mark, preload, start_import_profiler, startup_report
+
+# --startup-profile has to be seen before the imports below so that it can time them
+if "--startup-profile" in sys.argv[1:]:
+    start_import_profiler()
+
 # Imports
 try:
     from locales import SUPPORTED_LOCALES
-    from scrapers.property_scraper import scrape_property_data
+    from scrapers.property_scraper import SearchState, iter_search_results, settle_review_queue
+    from scrapers.match_review import read_review_file, review_cli, write_review_file
+    from scrapers.query_planner import MERGE_PREFIX_SEARCHES
     from scrapers.detail_scraper import scrape_details
-    from outputs.excel_writer import write_to_excel
-    from utils.logger import log_errors
+    from scrapers.pdf_downloader import OBJECTS_FOLDER_NAME, PDF_WORKERS, PdfDownloader
+    from scrapers.bill_extractor import BILL_COLUMNS, EXTRACT_WORKERS, PYPDF_AVAILABLE, BillExtractor
+    from outputs.writers import MultiWriter, parse_formats
+    from utils.logger import ErrorLogWriter
+    from utils import events, http_client
+    from utils.fetch_engine import DEFAULT_MAX_WORKERS, Throughput, get_default_limiter
+    from utils.pipeline import DONE, Stage, bounded_queue
+    from utils.checkpoint import JOURNAL_PATH, CheckpointJournal, file_sha256
+    from utils.property_store import get_property_store
+    from utils.metrics import METRICS_PATH, get_metrics, profiled, run_metrics
+    from utils.refresh import refresh_run
+    from utils.jobs import (DEFAULT_TAX_YEAR, expand_jobs, expand_searches, load_jobs, parse_tax_years,
+                            split_locales, split_owner_names)
 except ModuleNotFoundError as e:
     print(colored(f"Error: {e}. Ensure Scrappy's folder structure is intact.", "red"))
     sys.exit(1)
+mark("imports finished")
 
 # Define the output folder structure
 OUTPUT_FOLDER = os.path.join(current_dir, "outputs")
@@ -45,51 +67,102 @@ def confirm_cli(current_owner, match):
         if response in ["y", "n"]:
             return response == "y"
 
-def download_pdf(link, filename, current, total):
-    """Download PDF from the provided link."""
+def pdf_path(filename):
+    """Return the path a property's PDF is saved to."""
+    return os.path.join(PDF_FOLDER, f"{filename}.pdf")
+
+_pdf_downloader = None
+_pdf_downloader_lock = threading.Lock()
+
+def get_pdf_downloader():
+    """Return the shared PdfDownloader for PDF_FOLDER, creating it on first use."""
+    global _pdf_downloader
+    with _pdf_downloader_lock:
+        if _pdf_downloader is None or _pdf_downloader.folder != PDF_FOLDER:
+            _pdf_downloader = PdfDownloader(PDF_FOLDER)
+        return _pdf_downloader
+
+def download_pdf(link, filename, current, total=None):
+    """Download PDF from the provided link; return the downloader's result dict, or None without a link.
+
+    A failed or invalid download is reported as an error event and raised, so it counts as the property's error.
+    """
     if not link:
-        print(f"Invalid PDF link for {filename}. Skipping.")
-        return
+        events.emit("error", pdf=filename, message=f"Invalid PDF link for {filename}. Skipping.")
+        return None
     try:
-        response = requests.get(link, stream=True)
-        if response.status_code == 200:
-            file_path = os.path.join(PDF_FOLDER, f"{filename}.pdf")
-            with open(file_path, "wb") as pdf_file:
-                for chunk in response.iter_content(chunk_size=1024):
-                    pdf_file.write(chunk)
-            print(f"PDF {current} of {total} " + colored("downloaded successfully", "green") + f": {file_path}")
-        else:
-            print(colored(f"Failed to download PDF. Status: {response.status_code}", "red"))
+        result = get_pdf_downloader().download(link, pdf_path(filename))
     except Exception as e:
-        print(colored(f"Error downloading PDF: {e}", "red"))
+        events.emit("error", pdf=filename, link=link, message=f"Error downloading PDF: {e}")
+        raise
+    events.emit("pdf_saved", position=current, total=total, path=result["path"], status=result["status"],
+                size=result["size"], sha256=result["sha256"])
+    return result
 
 def get_user_input():
     """Get user input for owner names."""
     env_owners = os.getenv("SCRAPPY_OWNERS")
     return env_owners.split(";") if env_owners else input("Enter owner names (semicolon-separated): ").split(";")
 
-def select_locale():
-    """Prompt the user to select a locale."""
+def select_locales():
+    """Prompt the user to select one or more locales ("2", "1,3" or "all")."""
     locales = {index + 1: locale for index, locale in enumerate(SUPPORTED_LOCALES)}
     colors = ["green", "blue", "red", "cyan", "magenta"]
 
-    print("Select a locale:")
+    print("Select locales:")
     for num, loc in locales.items():
         color = colors[(num - 1) % len(colors)]
         print(f"{colored(num, color)}. {colored(SUPPORTED_LOCALES[loc]['name'], color)}")
 
     while True:
+        choice = input("Search by Locale (" + ", ".join([colored(str(num), colors[(num - 1) % len(colors)]) for num in locales]) + "; several as 1,3 or all): ").strip()
+        if choice.lower() == "all":
+            return list(locales.values())
         try:
-            locale_choice = int(input("Search by Locale (" + ", ".join([colored(str(num), colors[(num - 1) % len(colors)]) for num in locales]) + "): "))
-            return locales.get(locale_choice)
+            numbers = [int(part) for part in choice.split(",") if part.strip()]
         except ValueError:
-            print(colored("Invalid input. Please enter a valid number.", "red"))
+            numbers = []
+        if numbers and all(num in locales for num in numbers):
+            return list(dict.fromkeys(locales[num] for num in numbers))
+        print(colored("Invalid input. Please enter locale numbers separated by commas, or all.", "red"))
 
-def format_cli_output(property_data, errors, excel_file_path, error_log_path):
+def select_tax_years():
+    """Prompt the user for a tax year or range of years."""
+    while True:
+        value = input(f"Enter the tax year or range, e.g. 2020-2024 (default: {DEFAULT_TAX_YEAR}): ").strip()
+        try:
+            return parse_tax_years(value or DEFAULT_TAX_YEAR)
+        except ValueError as e:
+            print(colored(str(e), "red"))
+
+def format_cli_output(property_data, errors, output_files, error_log_path, throughput=None, journal=None,
+                      bill_extractor=None):
     """Format and display the CLI output for readability."""
     print("\n" + "=" * 40 + "\nSummary Report\n" + "=" * 40)
-    print(f"Excel file saved to: {colored(excel_file_path, 'green')}")
+    for fmt, path in output_files.items():
+        print(f"{fmt.upper()} file saved to: {colored(path, 'green')}")
     print(f"PDFs saved to: {colored(PDF_FOLDER, 'green')}")
+    if throughput:
+        print(f"Throughput: {colored(throughput.summary(), 'cyan')}")
+    cache = http_client.get_cache()
+    if cache:
+        print(f"HTTP cache: {colored(cache.summary(), 'cyan')}")
+    store = get_property_store()
+    if store:
+        print(f"Property store: {colored(store.summary(), 'cyan')}")
+    for line in get_default_limiter().summary():
+        print(f"Rate limit: {colored(line, 'cyan')}")
+    stage_lines = get_metrics().summary_lines()
+    if stage_lines:
+        print("Stage latency:")
+        for line in stage_lines:
+            print(f"  {colored(line, 'cyan')}")
+    if _pdf_downloader:
+        print(f"PDFs: {colored(_pdf_downloader.summary(), 'cyan')}")
+    if bill_extractor:
+        print(f"Bill text: {colored(bill_extractor.summary(), 'cyan')}")
+    if journal and journal.resumed:
+        print(f"Resumed from checkpoint: {colored(journal.resumed, 'cyan')} completed steps skipped")
 
     if property_data:
         print("\nProperty Data Summary:")
@@ -107,37 +180,460 @@ def format_cli_output(property_data, errors, excel_file_path, error_log_path):
         print(colored("\nNo errors encountered!", "green"))
 
     print("\nLogs saved to:")
-    print(f"- Data: {colored(excel_file_path, 'green')}")
+    for path in output_files.values():
+        print(f"- Data: {colored(path, 'green')}")
     print(f"- Errors: {colored(error_log_path, 'green')}")
     print("=" * 40)
 
-def main():
-    locale = select_locale()
-    tax_year = input("Enter the tax year (default: 2024): ").strip() or "2024"
-    input_names = [name.strip() for name in get_user_input() if name.strip()]
+def parse_args(argv=None):
+    """Parse command-line flags."""
+    parser = argparse.ArgumentParser(description="Scrape property tax data from MyGovOnline county sites.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run, skipping work recorded in the checkpoint journal.")
+    parser.add_argument("--locale", "--locales", dest="locale", default=os.getenv("SCRAPPY_LOCALE"),
+                        help=f"Comma-separated locales to search, or all ({', '.join(SUPPORTED_LOCALES)}; "
+                             "default: $SCRAPPY_LOCALE, otherwise prompt).")
+    parser.add_argument("--tax-year", "--tax-years", dest="tax_year", default=os.getenv("SCRAPPY_TAX_YEAR"),
+                        help=f"Tax years to search, e.g. 2024, 2020-2024 or 2020,2022 (default: $SCRAPPY_TAX_YEAR, "
+                             f"otherwise prompt; {DEFAULT_TAX_YEAR} in batch mode).")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f"Size of the shared worker pool (default: {DEFAULT_MAX_WORKERS}).")
+    parser.add_argument("--output", default=os.path.join(OUTPUT_FOLDER, "output.xlsx"),
+                        help="Output file; other formats are written next to it with their own extension.")
+    parser.add_argument("--format", default=os.getenv("SCRAPPY_OUTPUT_FORMAT", "xlsx"),
+                        help="Comma-separated output formats to write in one pass: xlsx, csv, jsonl, parquet "
+                             "(default: xlsx).")
+
+    batch = parser.add_argument_group("batch mode", "Run without any prompts. Enabled by --owners or --job-file.")
+    batch.add_argument("--owners", help="Semicolon-separated owner names.")
+    batch.add_argument("--job-file", help="JSON or CSV job file listing owner names, locales and tax years.")
+    batch.add_argument("--fuzzy", choices=["accept", "reject"], default="reject",
+                       help="How unreviewed borderline fuzzy matches are settled at the end (default: reject).")
+    parser.add_argument("--metrics-json", default=METRICS_PATH,
+                        help="Where to write the per-stage timing and request metrics report.")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="Profile the run: a cProfile dump, or a pyinstrument report if FILE ends in .html.")
+    parser.add_argument("--events", metavar="FILE", default=os.getenv("SCRAPPY_EVENTS"),
+                        help="Append every progress event to this file as JSON lines (default: $SCRAPPY_EVENTS).")
+    parser.add_argument("--quiet", action="store_true",
+                        default=os.getenv("SCRAPPY_QUIET", "").lower() in ("1", "true", "yes", "on"),
+                        help="Do not print progress while scraping; the summary is still printed.")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Print how long startup took to the first prompt and first request, and the slowest imports.")
+    parser.add_argument("--merge-prefix-searches", action="store_true", default=MERGE_PREFIX_SEARCHES,
+                        help="Answer a name such as \"Smith John\" from the search for \"Smith\" when both are searched. "
+                             "Only for counties whose owner search returns every name starting with the query "
+                             "(default: $SCRAPPY_MERGE_PREFIX_SEARCHES, otherwise off).")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Fetch search pages, details and PDFs again, ignoring the property store, the HTTP cache "
+                             "and bills saved by earlier runs.")
+    parser.add_argument("--extract-bills", action="store_true",
+                        default=os.getenv("SCRAPPY_EXTRACT_BILLS", "").lower() in ("1", "true", "yes", "on"),
+                        help="Read the bill amount, due date and paid status from each saved PDF into the output "
+                             "(requires pypdf).")
+    parser.add_argument("--review-file",
+                        help="Filled-in review CSV whose y/n decisions are saved before scraping starts.")
+    batch.add_argument("--summary-json", help="Also write the machine-readable run summary to this file.")
+    parser.add_argument("--checkpoint", default=JOURNAL_PATH,
+                        help="Checkpoint journal used by --resume (default: $SCRAPPY_JOURNAL_PATH or outputs/checkpoint.jsonl).")
+    parser.add_argument("--error-log", default=os.path.join(OUTPUT_FOLDER, "errors.log"),
+                        help="Where to write the properties that failed (default: outputs/errors.log).")
+
+    lookup = parser.add_argument_group("lookup", "Query the local property store without scraping.")
+    lookup.add_argument("--lookup-owner", help="Print stored properties whose owner name starts with this name.")
+    lookup.add_argument("--lookup-parcel", help="Print stored properties with this parcel number.")
+    lookup.add_argument("--lookup-address", help="Print stored properties whose address starts with this address.")
+
+    service = parser.add_argument_group("worker service", "Stay resident and take jobs over local HTTP (see service.py).")
+    service.add_argument("--serve", action="store_true", help="Run the worker service instead of a single search.")
+    service.add_argument("--port", type=int, default=int(os.getenv("SCRAPPY_SERVICE_PORT", "8770")),
+                         help="Port the service listens on, on 127.0.0.1 (default: $SCRAPPY_SERVICE_PORT or 8770).")
+    service.add_argument("--service-jobs", type=int, default=int(os.getenv("SCRAPPY_SERVICE_JOBS", "2")),
+                         help="How many jobs the service runs at once (default: $SCRAPPY_SERVICE_JOBS or 2).")
+
+    args = parser.parse_args(argv)
+    try:
+        args.formats = parse_formats(args.format)
+    except ValueError as e:
+        parser.error(str(e))
+    unknown = [locale for locale in split_locales(args.locale) if locale.lower() != "all"
+               and locale not in SUPPORTED_LOCALES]
+    if unknown:
+        parser.error(f"Unknown locale: {', '.join(unknown)}. Choose from: {', '.join(SUPPORTED_LOCALES)} or all")
+    try:
+        parse_tax_years(args.tax_year)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.extract_bills and not PYPDF_AVAILABLE:
+        parser.error("--extract-bills requires pypdf (pip install pypdf).")
+    args.batch = bool(args.owners or args.job_file)
+    return args
+
+def resolve_searches(args, journal):
+    """Work out the (owner_name, locale, tax_year) searches for this run and record them in the journal."""
+    run = journal.peek("run", "params")
+    if run:
+        searches = [tuple(search) for search in run["searches"]]
+        print(f"Resuming run from checkpoint: {colored(len(searches), 'cyan')} searches")
+        return searches
+
+    if args.batch:
+        tax_year = args.tax_year or DEFAULT_TAX_YEAR
+        jobs = load_jobs(args.job_file, args.locale, tax_year) if args.job_file else []
+        if args.owners:
+            jobs.append({"locale": args.locale or "", "tax_year": tax_year, "owners": split_owner_names(args.owners)})
+        try:
+            searches = expand_jobs(jobs, list(SUPPORTED_LOCALES))
+        except ValueError as e:
+            print(colored(f"Invalid job: {e}", "red"))
+            sys.exit(2)
+        unsupported = sorted({locale for _, locale, _ in searches if locale not in SUPPORTED_LOCALES})
+        if unsupported:
+            print(colored(f"Unsupported or missing locale in job: {', '.join(repr(l) for l in unsupported)}. "
+                          f"Choose from: {', '.join(sorted(SUPPORTED_LOCALES))}", "red"))
+            sys.exit(2)
+    else:
+        mark("first prompt shown")
+        locales = split_locales(args.locale, list(SUPPORTED_LOCALES)) or select_locales()
+        tax_years = parse_tax_years(args.tax_year) or select_tax_years()
+        input_names = [name.strip() for name in get_user_input() if name.strip()]
+        searches = expand_searches(list(dict.fromkeys(input_names)), locales, tax_years)
+
+    journal.record("run", "params", searches=searches)
+    return searches
+
+def review_deferred_matches(state, args, reviewer=None):
+    """Settle every borderline match collected during scraping in one batch.
+
+    Pairs decided in earlier runs are applied silently. Interactive runs review the rest
+    in a single table; batch runs write them to a review CSV and fall back to --fuzzy.
+    A `reviewer` (the worker service's job) is given the rest instead and returns the
+    decisions it got. Returns the accepted matches and the review CSV written (or None).
+    """
+    pairs = state.review_queue.pairs()
+    if not pairs:
+        return [], None
+    decisions = {}
+    for pair in pairs:
+        known = state.decisions.get(*pair)
+        if known is not None:
+            decisions[pair] = known
+    undecided = {pair: count for pair, count in pairs.items() if pair not in decisions}
+
+    if undecided and reviewer:
+        # Only the reviewer's own answers are saved; pairs it left open fall back to --fuzzy for this run
+        reviewed = reviewer(undecided)
+        if reviewed:
+            state.decisions.set_many(reviewed)
+        decisions.update(reviewed)
+        decisions.update({pair: args.fuzzy == "accept" for pair in undecided if pair not in reviewed})
+        return settle_review_queue(state, decisions, persist=False), None
+    # Progress is written in the background; let it finish before the review output
+    events.flush_events()
+    if undecided and args.batch:
+        path = write_review_file(undecided)
+        print(colored(f"{len(undecided)} borderline matches were {args.fuzzy}ed for this run and written to {path}. "
+                      f"Fill in the decision column and rerun with --review-file to save them.", "yellow"))
+        decisions.update({pair: args.fuzzy == "accept" for pair in undecided})
+        return settle_review_queue(state, decisions, persist=False), path
+    if undecided:
+        decisions.update(review_cli(undecided))
+    return settle_review_queue(state, decisions), None
+
+def build_run_summary(searches, property_count, errors, output_files, error_log_path, throughput, journal,
+                      review_file_path=None, bill_extractor=None):
+    """Build the machine-readable summary printed at the end of a batch run.
 
+    Cache, store and bill counts come from the run's own metrics, so concurrent runs in
+    the worker service do not count each other's work.
+    """
+    cache = http_client.get_cache()
+    store = get_property_store()
+    counters = get_metrics().report()["counters"]
+    return {
+        "status": "completed_with_errors" if errors else "ok",
+        "searches": len(searches),
+        "locales": sorted({locale for _, locale, _ in searches}),
+        "tax_years": sorted({tax_year for _, _, tax_year in searches}),
+        "properties": property_count,
+        "excel_file": output_files.get("xlsx"),
+        "output_files": output_files,
+        "error_log": error_log_path,
+        "pdf_folder": PDF_FOLDER,
+        "errors": errors,
+        "throughput": {
+            "detail_pages": throughput.pages,
+            "pdfs": throughput.pdfs,
+            "bytes": throughput.bytes,
+            "elapsed_seconds": round(throughput.elapsed, 3),
+        },
+        "cache": {key: counters.get(f"cache_{key}", 0) for key in ("hits", "revalidated", "misses")} if cache else None,
+        "resumed_steps": journal.resumed,
+        "store": {key: counters.get(f"store_{key}", 0) for key in ("new", "refreshed", "unchanged_reused")}
+        if store else None,
+        "review_queue_file": review_file_path,
+        "bills": {key: counters.get(f"bills_{key}", 0) for key in ("extracted", "cached", "unreadable")}
+        if bill_extractor else None,
+        "metrics": get_metrics().report(),
+    }
+
+def lookup_properties(args):
+    """Print stored properties matching the --lookup-* flags as JSON lines; return the exit code."""
+    store = get_property_store()
+    if not store:
+        print(colored("The property store is disabled (SCRAPPY_STORE=off).", "red"))
+        return 2
+    results = []
+    if args.lookup_owner:
+        results.extend(store.find_by_owner(args.lookup_owner))
+    if args.lookup_parcel:
+        results.extend(store.find_by_parcel(args.lookup_parcel))
+    if args.lookup_address:
+        results.extend(store.find_by_address(args.lookup_address))
+    for result in results:
+        print(json.dumps(result))
+    return 0 if results else 1
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.events or args.quiet:
+        events.configure_events(args.events, args.quiet)
+    if args.lookup_owner or args.lookup_parcel or args.lookup_address:
+        return lookup_properties(args)
+    if args.serve:
+        from service import serve
+        return serve(parse_args, run, port=args.port, jobs=args.service_jobs)
+    try:
+        if args.profile:
+            with profiled(args.profile) as profile_path:
+                exit_code = run(args)
+            print(f"Profile saved to: {colored(profile_path, 'green')}")
+            return exit_code
+        return run(args)
+    finally:
+        if args.startup_profile:
+            print("\nStartup profile:")
+            for line in startup_report():
+                print(f"  {colored(line, 'cyan')}")
+
+def run(args, on_event=None, reviewer=None, bill_extractor=None):
+    """Search, process and write every property for the parsed command-line `args`; return the exit code.
+
+    The worker service passes `on_event` for progress events, a `reviewer` for borderline
+    matches and its long-lived `bill_extractor`; a run only closes an extractor it created.
+    Every event of the run reaches `on_event`, and its metrics and --refresh setting are
+    kept apart from other runs in the process.
+    """
+    with events.listening(on_event), run_metrics(), refresh_run(args.refresh):
+        return run_searches(args, reviewer, bill_extractor)
+
+def run_searches(args, reviewer=None, bill_extractor=None):
+    """The body of run(), inside the run's event listener, metrics and --refresh setting."""
+    journal = CheckpointJournal(path=args.checkpoint, resume=args.resume)
+    searches = resolve_searches(args, journal)
+    # Load the workbook library while the first searches wait on the network
+    preload(["openpyxl"] if "xlsx" in args.formats else [])
+    store = get_property_store()
+    state = SearchState(journal, fuzzy_policy="defer", store=store)
+    if args.review_file:
+        state.decisions.set_many(read_review_file(args.review_file))
+
+    error_log_path = args.error_log
+    # Only the few fields the interactive summary prints are kept, and only when it is shown
+    property_data = None if args.batch else []
+    property_count = 0
+
+    def write_property(property):
+        nonlocal property_count
+        property_count += 1
+        writer.append(property)
+        error_log.append(property)
+        if property_data is not None:
+            property_data.append({key: property.get(key) for key in ("Matched Name", "Address", "Account", "Year")})
+        events.emit("property_written", position=property.position, matched_name=property.get("Matched Name"),
+             address=property.get("Address"), account=property.get("Account"), year=property.get("Year"),
+             error=property.get("Error"))
+
+    error_log = ErrorLogWriter(error_log_path)
+    owns_extractor = args.extract_bills and bill_extractor is None
+    if owns_extractor:
+        bill_extractor = BillExtractor(os.path.join(PDF_FOLDER, OBJECTS_FOLDER_NAME))
+    elif not args.extract_bills:
+        bill_extractor = None
+    try:
+        with MultiWriter(args.output, args.formats, BILL_COLUMNS if bill_extractor else ()) as writer:
+            throughput, errors, review_file_path = stream_properties(searches, state, args, journal, write_property,
+                                                                     store, bill_extractor, reviewer)
+    finally:
+        if owns_extractor:
+            bill_extractor.close()
+    error_log.close()
+    output_files = writer.paths
+    get_metrics().incr("properties", property_count)
+    get_metrics().incr("property_errors", len(errors))
+    get_metrics().write(args.metrics_json)
+    events.emit("metrics_saved", path=args.metrics_json)
+    summary = build_run_summary(searches, property_count, errors, output_files, error_log_path, throughput, journal,
+                                review_file_path, bill_extractor)
+    events.emit("run_summary", **summary)
+    events.flush_events()
+
+    if args.batch:
+        if args.summary_json:
+            with open(args.summary_json, "w") as summary_file:
+                json.dump(summary, summary_file, indent=2)
+        print(json.dumps(summary))
+    else:
+        format_cli_output(property_data, errors, output_files, error_log_path, throughput, journal, bill_extractor)
+    journal.close()
+    return 1 if errors else 0
+
+def stream_properties(searches, state, args, journal, on_complete, store=None, bill_extractor=None, reviewer=None):
+    """Search, enrich and write properties as one streaming pipeline.
+
+    Matches flow from the owner searches through bounded queues to a pool that scrapes
+    details, a pool that downloads PDFs, optionally a stage that reads bill fields from the
+    saved PDFs with `bill_extractor`, and finally `on_complete(property)`. Detail fetching overlaps search paging, rows are written as
+    soon as they are ready (in completion order), and nothing is held for the whole run.
+    `reviewer` is passed through from run().
+    Returns (throughput, errors, review_file_path).
+    """
+    throughput = Throughput()
     errors = []
-    property_data = scrape_property_data(input_names, locale=locale, tax_year=tax_year)
-    process_properties(property_data, errors)
+    positions = itertools.count(1)
+    matches = bounded_queue()
+    detailed = bounded_queue()
+    downloaded = bounded_queue() if bill_extractor else None
+    finished = bounded_queue()
+
+    def enrich(property):
+        return property, scrape_property_details(property, throughput, journal, store)
+
+    def fetch_pdf(result):
+        property, error = result
+        return property, error or fetch_property_pdf(property, property.position, None, throughput, journal, store)
 
-    excel_file_path = os.path.join(OUTPUT_FOLDER, "output.xlsx")
-    write_to_excel(property_data, excel_file_path)
+    def extract_bill(result):
+        property, _ = result
+        if "_pdf" in property:
+            path, sha256 = property["_pdf"]
+            property.update(bill_extractor.extract(sha256, path))
+        return result
 
-    error_log_path = os.path.join(OUTPUT_FOLDER, "errors.log")
-    log_errors(property_data, error_log_path)
+    def sink(result):
+        property, error = result
+        property.pop("_pdf", None)
+        if error:
+            errors.append(error)
+        on_complete(property)
 
-    format_cli_output(property_data, errors, excel_file_path, error_log_path)
+    processing = Stage(enrich, matches, detailed, workers=args.workers, name="details").start()
+    downloading = Stage(fetch_pdf, detailed, downloaded or finished, workers=PDF_WORKERS, name="pdfs").start()
+    # Extraction runs in worker processes; these threads only wait on them, one per process
+    extracting = Stage(extract_bill, downloaded, finished, workers=EXTRACT_WORKERS,
+                       name="bills").start() if bill_extractor else None
+    writing = Stage(sink, finished, name="write").start()
+    def enqueue(match):
+        # Numbered in the order properties enter the pipeline, for progress labels
+        match.position = next(positions)
+        matches.put(match)
 
-def process_properties(property_data, errors):
-    """Process each property by scraping details and downloading PDFs."""
-    for property in property_data:
+    state.on_match = enqueue
+    try:
+        for (owner_name, locale, tax_year), results in iter_search_results(
+                searches, max_workers=args.workers, state=state, merge_prefixes=args.merge_prefix_searches):
+            events.emit("owner_finished", owner=owner_name, locale=locale, tax_year=tax_year,
+                        properties=len(results))
+        for owner_name, locale, tax_year, page, reason in state.incomplete_searches:
+            errors.append(f"Search for {owner_name} ({locale}, {tax_year}) stopped at page {page}: {reason}")
+
+        # Keep detail, download and bill progress from scrolling past the review prompt
+        paused = [stage for stage in (processing, downloading, extracting) if stage]
+        for stage in paused:
+            stage.pause()
         try:
-            details = scrape_details(property["Link"])
-            property.update(details)
-            pdf_filename = f"{property.get('Parcel', 'Unknown').replace('/', '_')}_{property.get('Matched Name', 'Unknown').replace('/', '_')}"
-            download_pdf(property.get("PDF Link"), pdf_filename, property_data.index(property) + 1, len(property_data))
-        except Exception as e:
-            errors.append(f"Error processing property: {property.get('Matched Name', 'Unknown')} - {e}")
+            accepted, review_file_path = review_deferred_matches(state, args, reviewer)
+        finally:
+            for stage in paused:
+                stage.resume()
+        for match in accepted:
+            enqueue(match)
+    finally:
+        matches.put(DONE)
+        # Wait for every stage, even after one has failed, so none is still writing when this returns
+        stage_errors = []
+        for stage in (processing, downloading, extracting, writing):
+            if stage:
+                try:
+                    stage.join()
+                except Exception as e:
+                    stage_errors.append(e)
+        throughput.stop()
+        events.flush_events()
+    if stage_errors:
+        raise stage_errors[0]
+    return throughput, errors, review_file_path
+
+def scrape_property_details(property, throughput, journal=None, store=None):
+    """Add the detail page fields to a property (from the journal or store when possible); return an error or None."""
+    try:
+        link = property["Link"]
+        completed = journal.get("detail", link) if journal and link else None
+        stored_details, stored_pdf = store.stored_details(property) if store and not completed else (None, None)
+        if completed:
+            details = completed["details"]
+        elif stored_details:
+            details = stored_details
+        else:
+            details = scrape_details(link, property.get("Locale"), property.get("Year"))
+            throughput.add(pages=1)
+            if link and not details:
+                # scrape_details has emitted the reason; the property still goes out, flagged as failed
+                return (f"Error processing property: {property.get('Matched Name', 'Unknown')} - "
+                        f"could not fetch details from {link}")
+            if journal and details:
+                journal.record("detail", link, details=details)
+            if store and details:
+                store.upsert_details(property, details)
+        property.update(details)
+        if stored_pdf:
+            property["_stored_pdf"] = stored_pdf
+    except Exception as e:
+        return f"Error processing property: {property.get('Matched Name', 'Unknown')} - {e}"
+    return None
+
+def fetch_property_pdf(property, position, total, throughput, journal=None, store=None):
+    """Download a property's PDF unless the journal or store shows it is already saved; return an error or None."""
+    try:
+        stored_pdf = property.pop("_stored_pdf", None)
+        # Each locale and tax year has its own bill, so both are part of the file name and journal key
+        pdf_filename = "_".join(str(property.get(key) or "Unknown").replace("/", "_")
+                                for key in ("Parcel", "Matched Name", "Locale", "Year"))
+        file_path = pdf_path(pdf_filename)
+        if journal and journal.pdf_is_complete(pdf_filename, file_path):
+            events.emit("pdf_saved", position=position, total=total, path=file_path, status="checkpoint")
+            property["_pdf"] = (file_path, journal.peek("pdf", pdf_filename)["sha256"])
+            return None
+        if stored_pdf and os.path.exists(file_path) and file_sha256(file_path) == stored_pdf:
+            events.emit("pdf_saved", position=position, total=total, path=file_path, status="unchanged")
+            property["_pdf"] = (file_path, stored_pdf)
+            return None
+        result = download_pdf(property.get("PDF Link"), pdf_filename, position, total)
+        if result:
+            # (path, sha256) of the saved bill, for the bill text stage
+            property["_pdf"] = (file_path, result["sha256"])
+            if result["status"] == "downloaded":
+                throughput.add(pdfs=1, nbytes=result["size"])
+            if journal:
+                journal.record("pdf", pdf_filename, size=result["size"], sha256=result["sha256"])
+            if store:
+                store.upsert_pdf(property, result["sha256"])
+    except Exception as e:
+        return f"Error processing property: {property.get('Matched Name', 'Unknown')} - PDF download failed: {e}"
+    return None
 
 if __name__ == "__main__":
-    main()
+    # Lets a frozen build start the --extract-bills worker processes
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
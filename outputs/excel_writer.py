@@ -1,56 +1,94 @@
-import openpyxl
+import threading
+from utils.events import emit
 from utils.normalizer import normalize_text
 
+HEADERS = [
+    "Input Name", "Matched Name", "Address", "Account", "Year", "Locale",
+    "Parcel", "Improvement Value", "Land Value", "Personal Property Value",
+    "Assessment Rate", "Tax Rate", "Total Value", "Assessed Value", "Tax"
+]
+
 # Utility to convert text to numeric values
 def _convert_to_number(value):
     """Convert text to a numeric value, handling commas, dollar signs, and non-numeric characters."""
+    # PropertyRecord parses its numbers when they are scraped
+    if isinstance(value, (int, float)):
+        return value
     try:
         cleaned_value = value.replace(",", "").replace("$", "").replace("%", "").replace("x", "").strip()
         return float(cleaned_value)
     except (ValueError, AttributeError):
         return ""
 
+def build_row(item, row_index):
+    """Build one sheet row, including the Total Value, Assessed Value and Tax formulas."""
+    return [
+        item.get("Input Name", ""),
+        item.get("Matched Name", ""),
+        item.get("Address", ""),
+        item.get("Account", ""),
+        item.get("Year", ""),
+        item.get("Locale", ""),
+        item.get("Parcel", ""),
+        _convert_to_number(item.get("Improvement Value", "")),
+        _convert_to_number(item.get("Land Value", "")),
+        _convert_to_number(item.get("Personal Property Value", "")),
+        f"{_convert_to_number(item.get('Assessment Rate', ''))}%",  # Keep percentage
+        _convert_to_number(item.get("Tax Rate", "")),
+        f"=H{row_index}+I{row_index}+j{row_index}",  # Total Value
+        f"=M{row_index}*(K{row_index})",  # Assessed Value
+        f"=N{row_index}*(L{row_index}/100)",  # Tax
+    ]
+
+class ExcelStreamWriter:
+    """Append rows to a write-only workbook as properties complete.
+
+    openpyxl streams write-only rows to a temporary file, so memory stays flat
+    however many rows are written. The workbook is saved on close(). openpyxl is
+    imported when the first row arrives, so it never delays the first request.
+    """
+
+    def __init__(self, filename, extra_columns=()):
+        self.filename = filename
+        self.rows = 0
+        # (name, "number" | "text") columns appended after Tax, so the formula columns keep their letters
+        self.extra_columns = list(extra_columns)
+        self._lock = threading.Lock()
+        self._workbook = None
+        self._sheet = None
+
+    def _open(self):
+        import openpyxl
+        self._workbook = openpyxl.Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet("enter data")
+        self._sheet.append(HEADERS + [name for name, _ in self.extra_columns])
+
+    def append(self, item):
+        extra = [_convert_to_number(item.get(name, "")) if kind == "number" else item.get(name, "")
+                 for name, kind in self.extra_columns]
+        with self._lock:
+            if self._sheet is None:
+                self._open()
+            self.rows += 1
+            # Row 1 holds the headers
+            self._sheet.append(build_row(item, self.rows + 1) + extra)
+
+    def close(self):
+        with self._lock:
+            if self._workbook is None:
+                self._open()
+            self._workbook.save(self.filename)
+        emit("output_written", path=self.filename, rows=self.rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
 # Write data to Excel
 def write_to_excel(data, filename):
     """Write scraped data to an Excel file."""
-    wb = openpyxl.Workbook()
-    sheet = wb.active
-    sheet.title = "enter data"
-
-    # Define headers
-    headers = [
-        "Input Name", "Matched Name", "Address", "Account", "Year", "Locale",
-        "Parcel", "Improvement Value", "Land Value", "Personal Property Value",
-        "Assessment Rate", "Tax Rate", "Total Value", "Assessed Value", "Tax"
-    ]
-    sheet.append(headers)
-
-    # Populate rows with scraped data
-    for row_index, item in enumerate(data, start=2):
-        # Add data to the sheet
-        sheet.append([
-            item.get("Input Name", ""),
-            item.get("Matched Name", ""),
-            item.get("Address", ""),
-            item.get("Account", ""),
-            item.get("Year", ""),
-            item.get("Locale", ""),
-            item.get("Parcel", ""),
-            _convert_to_number(item.get("Improvement Value", "")),
-            _convert_to_number(item.get("Land Value", "")),
-            _convert_to_number(item.get("Personal Property Value", "")),
-            f"{_convert_to_number(item.get('Assessment Rate', ''))}%",  # Keep percentage
-            _convert_to_number(item.get("Tax Rate", "")),
-            None,  # Placeholder for Total Value formula
-            None,  # Placeholder for Assessed Value formula
-            None   # Placeholder for Tax formula
-        ])
-
-        # Insert formulas
-        sheet[f"M{row_index}"] = f"=H{row_index}+I{row_index}+j{row_index}"  # Total Value
-        sheet[f"N{row_index}"] = f"=M{row_index}*(K{row_index})"  # Assessed Value
-        sheet[f"O{row_index}"] = f"=N{row_index}*(L{row_index}/100)"  # Tax
-
-    # Save the workbook
-    wb.save(filename)
-    print(f"Data written to {filename}")
+    with ExcelStreamWriter(filename) as writer:
+        for item in data:
+            writer.append(item)
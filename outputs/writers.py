@@ -0,0 +1,190 @@
+import csv
+import json
+import os
+import threading
+from outputs.excel_writer import HEADERS, ExcelStreamWriter, _convert_to_number
+from utils.events import emit
+from utils.metrics import timed
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+TEXT_COLUMNS = ["Input Name", "Matched Name", "Address", "Account", "Year", "Locale", "Parcel"]
+NUMBER_COLUMNS = [
+    "Improvement Value", "Land Value", "Personal Property Value", "Assessment Rate", "Tax Rate",
+    "Total Value", "Assessed Value", "Tax",
+]
+# Rows buffered per Parquet row group
+PARQUET_BATCH_SIZE = 10000
+
+
+def build_typed_row(item, extra_columns=()):
+    """Build one output row with numbers as floats (None when blank) and the Excel formulas computed.
+
+    Total Value = Improvement + Land + Personal Property, Assessed Value = Total Value *
+    Assessment Rate / 100 and Tax = Assessed Value * Tax Rate / 100, matching the sheet.
+    `extra_columns` are (name, "number" | "text") pairs added after Tax.
+    """
+    row = {column: item.get(column, "") for column in TEXT_COLUMNS}
+    for column in NUMBER_COLUMNS[:5]:
+        number = _convert_to_number(item.get(column, ""))
+        row[column] = None if number == "" else number
+
+    values = [row["Improvement Value"], row["Land Value"], row["Personal Property Value"]]
+    total = sum(values) if None not in values else None
+    assessed = total * row["Assessment Rate"] / 100 if total is not None and row["Assessment Rate"] is not None else None
+    row["Total Value"] = total
+    row["Assessed Value"] = assessed
+    row["Tax"] = assessed * row["Tax Rate"] / 100 if assessed is not None and row["Tax Rate"] is not None else None
+    for name, kind in extra_columns:
+        value = item.get(name, "")
+        if kind == "number":
+            value = _convert_to_number(value)
+            value = None if value == "" else value
+        row[name] = value
+    return row
+
+
+class CSVStreamWriter:
+    """Write typed rows to a CSV file as properties complete."""
+
+    def __init__(self, filename, extra_columns=()):
+        self.filename = filename
+        self.rows = 0
+        self.extra_columns = list(extra_columns)
+        self._lock = threading.Lock()
+        self._file = open(filename, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=HEADERS + [name for name, _ in self.extra_columns])
+        self._writer.writeheader()
+
+    def append(self, item):
+        row = build_typed_row(item, self.extra_columns)
+        with self._lock:
+            self.rows += 1
+            self._writer.writerow(row)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+        emit("output_written", path=self.filename, rows=self.rows)
+
+
+class JSONLStreamWriter:
+    """Write one typed JSON object per line as properties complete."""
+
+    def __init__(self, filename, extra_columns=()):
+        self.filename = filename
+        self.rows = 0
+        self.extra_columns = list(extra_columns)
+        self._lock = threading.Lock()
+        self._file = open(filename, "w", encoding="utf-8")
+
+    def append(self, item):
+        line = json.dumps(build_typed_row(item, self.extra_columns), ensure_ascii=False)
+        with self._lock:
+            self.rows += 1
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+        emit("output_written", path=self.filename, rows=self.rows)
+
+
+class ParquetStreamWriter:
+    """Write typed rows to a Parquet file, one row group per PARQUET_BATCH_SIZE rows."""
+
+    def __init__(self, filename, extra_columns=(), batch_size=PARQUET_BATCH_SIZE):
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow).")
+        self.filename = filename
+        self.rows = 0
+        self.batch_size = batch_size
+        self.extra_columns = list(extra_columns)
+        self._lock = threading.Lock()
+        self._schema = pa.schema(
+            [(column, pa.string()) for column in TEXT_COLUMNS] + [(column, pa.float64()) for column in NUMBER_COLUMNS]
+            + [(name, pa.float64() if kind == "number" else pa.string()) for name, kind in self.extra_columns]
+        )
+        self._writer = pq.ParquetWriter(filename, self._schema)
+        self._batch = []
+
+    def append(self, item):
+        row = build_typed_row(item, self.extra_columns)
+        with self._lock:
+            self.rows += 1
+            self._batch.append(row)
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+
+    def _flush(self):
+        if self._batch:
+            self._writer.write_table(pa.Table.from_pylist(self._batch, schema=self._schema))
+            self._batch = []
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._writer.close()
+        emit("output_written", path=self.filename, rows=self.rows)
+
+
+OUTPUT_FORMATS = {
+    "xlsx": ExcelStreamWriter,
+    "csv": CSVStreamWriter,
+    "jsonl": JSONLStreamWriter,
+    "parquet": ParquetStreamWriter,
+}
+
+
+def parse_formats(value):
+    """Split a comma-separated format list such as "xlsx,parquet", keeping order and dropping repeats."""
+    formats = list(dict.fromkeys(part.strip().lower() for part in (value or "").split(",") if part.strip()))
+    unknown = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown output format: {', '.join(unknown)}. Choose from: {', '.join(OUTPUT_FORMATS)}")
+    if "parquet" in formats and not PYARROW_AVAILABLE:
+        raise ValueError("Parquet output requires pyarrow (pip install pyarrow).")
+    return formats or ["xlsx"]
+
+
+def output_paths(output, formats):
+    """Map each format to `output` with that format's extension."""
+    base = os.path.splitext(output)[0]
+    return {fmt: f"{base}.{fmt}" for fmt in formats}
+
+
+class MultiWriter:
+    """Fan each completed property out to one writer per output format in a single pass.
+
+    `extra_columns` are (name, "number" | "text") pairs every writer adds after the standard columns.
+    """
+
+    def __init__(self, output, formats, extra_columns=()):
+        self.paths = output_paths(output, formats)
+        self.writers = []
+        try:
+            for fmt, path in self.paths.items():
+                self.writers.append(OUTPUT_FORMATS[fmt](path, extra_columns))
+        except Exception:
+            self.close()
+            raise
+
+    def append(self, item):
+        with timed("write"):
+            for writer in self.writers:
+                writer.append(item)
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
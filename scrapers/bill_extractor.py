@@ -0,0 +1,151 @@
+import contextvars
+import importlib.util
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import Future
+from utils.metrics import get_metrics
+
+# pypdf is only imported by the worker processes, so runs without --extract-bills never load it
+PYPDF_AVAILABLE = importlib.util.find_spec("pypdf") is not None
+
+# Text extraction is CPU-bound, so it runs on one process per core by default
+EXTRACT_WORKERS = int(os.getenv("SCRAPPY_EXTRACT_WORKERS", "0")) or os.cpu_count() or 1
+CACHE_FILE_NAME = "bill_fields.jsonl"
+# Bumped when parse_bill_fields changes, so cached fields from an older parser are extracted again
+PARSER_VERSION = 2
+
+# Columns added to the outputs, with the type the typed writers store them as
+BILL_COLUMNS = [("Bill Amount", "number"), ("Due Date", "text"), ("Paid Status", "text")]
+
+AMOUNT_PATTERN = re.compile(
+    r"(?:total\s+(?:amount\s+)?due|amount\s+due|balance\s+due|total\s+tax\s+due)\s*:?\s*\$?\s*([\d,]+\.\d{2})",
+    re.IGNORECASE)
+DUE_DATE_PATTERN = re.compile(
+    r"(?:due\s+date|pay\s+by|delinquent\s+after)\s*:?\s*(\d{1,2}/\d{1,2}/\d{2,4}|[A-Z][a-z]+\.?\s+\d{1,2},\s*\d{4})",
+    re.IGNORECASE)
+# A "PAID" / "PAID IN FULL" stamp on a line of its own (optionally dated), not a label like "Amount Paid:"
+PAID_PATTERN = re.compile(r"^\s*PAID(?:\s+IN\s+FULL)?(?:\s+\d{1,2}/\d{1,2}/\d{2,4})?\s*$", re.MULTILINE)
+UNPAID_PATTERN = re.compile(r"\bUNPAID\b|\bDELINQUENT\b", re.IGNORECASE)
+
+
+def parse_bill_fields(text):
+    """Pull the bill amount, due date and paid status out of a bill's text; missing fields are "".
+
+    The amount due decides the status when there is one (anything owed is Unpaid);
+    otherwise only a PAID stamp or an UNPAID/DELINQUENT notice does.
+    """
+    amount = AMOUNT_PATTERN.search(text)
+    due_date = DUE_DATE_PATTERN.search(text)
+    if amount:
+        status = "Unpaid" if float(amount.group(1).replace(",", "")) > 0 else "Paid"
+    elif PAID_PATTERN.search(text):
+        status = "Paid"
+    elif UNPAID_PATTERN.search(text):
+        status = "Unpaid"
+    else:
+        status = ""
+    return {
+        "Bill Amount": f"${amount.group(1)}" if amount else "",
+        "Due Date": due_date.group(1) if due_date else "",
+        "Paid Status": status,
+    }
+
+
+def extract_bill_fields(path):
+    """Read a saved bill's text layer and parse its fields (runs in a worker process)."""
+    from pypdf import PdfReader
+    # pypdf logs every recoverable defect; unreadable bills are counted instead
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+    try:
+        reader = PdfReader(path)
+        text = "\n".join(page.extract_text() or "" for page in reader.pages)
+    except Exception as e:
+        return {"fields": {}, "error": f"{type(e).__name__}: {e}"}
+    return {"fields": parse_bill_fields(text), "error": None}
+
+
+class BillExtractor:
+    """Extract bill fields from saved PDFs on a process pool, caching results by PDF hash.
+
+    The cache is an append-only JSONL file next to the PDF objects, so reruns only
+    extract bills that have not been seen before.
+    """
+
+    def __init__(self, folder, workers=EXTRACT_WORKERS):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        if not PYPDF_AVAILABLE:
+            raise RuntimeError("Bill extraction requires pypdf (pip install pypdf).")
+        self.cache_path = os.path.join(folder, CACHE_FILE_NAME)
+        self.extracted = 0
+        self.cached = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._pending = {}
+        os.makedirs(folder, exist_ok=True)
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path, encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("version") == PARSER_VERSION:
+                        self._cache[entry["sha256"]] = entry["fields"]
+        self._file = open(self.cache_path, "a", encoding="utf-8")
+        # Workers are started from a threaded process, where fork is unsafe
+        self._pool = ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, sha256, path):
+        """Return a Future of the fields of the PDF at `path` whose content hash is `sha256`."""
+        with self._lock:
+            if sha256 in self._cache:
+                self.cached += 1
+                get_metrics().incr("bills_cached")
+                future = Future()
+                future.set_result(self._cache[sha256])
+                return future
+            if sha256 in self._pending:
+                return self._pending[sha256]
+            future = Future()
+            self._pending[sha256] = future
+        # The callback runs on the pool's thread; it counts towards the run that submitted the bill
+        context = contextvars.copy_context()
+        self._pool.submit(extract_bill_fields, path).add_done_callback(
+            lambda done: context.run(self._finish, sha256, done, future))
+        return future
+
+    def _finish(self, sha256, done, future):
+        try:
+            result = done.result()
+        except Exception as e:
+            result = {"fields": {}, "error": f"{type(e).__name__}: {e}"}
+        with self._lock:
+            self._pending.pop(sha256, None)
+            if result["error"]:
+                self.failed += 1
+            else:
+                self.extracted += 1
+            get_metrics().incr("bills_unreadable" if result["error"] else "bills_extracted")
+            # Failures are cached too: the same bytes will fail the same way next run
+            self._cache[sha256] = result["fields"]
+            self._file.write(json.dumps({"sha256": sha256, "version": PARSER_VERSION, "fields": result["fields"],
+                                        "error": result["error"]}) + "\n")
+            self._file.flush()
+        future.set_result(result["fields"])
+
+    def extract(self, sha256, path):
+        """Return the fields of one PDF, waiting for the process pool if needed."""
+        return self.submit(sha256, path).result()
+
+    def summary(self):
+        return f"{self.extracted} bills extracted, {self.cached} from cache, {self.failed} unreadable"
+
+    def close(self):
+        self._pool.shutdown()
+        with self._lock:
+            self._file.close()
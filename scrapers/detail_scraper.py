@@ -1,27 +1,49 @@
-import requests
-from bs4 import BeautifulSoup
+from utils import http_client
+from utils.events import emit
+from utils.html_parsing import extract_labeled_values
+from utils.jobs import DEFAULT_TAX_YEAR
+from utils.metrics import timed
+from utils.property_record import parse_number
 
-def scrape_details(link):
+DETAIL_LABELS = [
+    "Parcel:",
+    "Improvement Value:",
+    "Land Value:",
+    "Personal Property Value:",
+    "Taxable Property:",
+]
+
+def tax_rate_label(tax_year):
+    """Return the detail page label of the rate for a tax year, e.g. "2024 Tax Rate:"."""
+    return f"{tax_year or DEFAULT_TAX_YEAR} Tax Rate:"
+
+def scrape_details(link, locale=None, tax_year=DEFAULT_TAX_YEAR):
+    """Scrape a property's detail page; values are parsed into numbers here, once, rather than at write time.
+
+    The tax rate is read from the `tax_year` row of the page.
+    """
     if not link:
         return {}
     try:
-        response = requests.get(link)
+        with timed("detail_get") as timing:
+            response = http_client.get(link, resource="detail")
+            timing["bytes"] = len(response.content)
         if response.status_code == 200:
-            soup = BeautifulSoup(response.text, "html.parser")
+            with timed("parse"):
+                values = extract_labeled_values(response.text, DETAIL_LABELS + [tax_rate_label(tax_year)], locale)
 
             def safe_find(label):
-                try:
-                    return soup.find("td", string=label).find_next("td").text.strip()
-                except AttributeError:
-                    print(f"Warning: Could not find '{label}' in {link}")
+                if label not in values:
+                    emit("warning", link=link, label=label, message=f"Warning: Could not find '{label}' in {link}")
                     return ""
+                return values[label]
 
             parcel = safe_find("Parcel:")
-            improvement_value = safe_find("Improvement Value:")
-            land_value = safe_find("Land Value:")
-            personal_property_value = safe_find("Personal Property Value:")
-            taxable_property = safe_find("Taxable Property:").replace("x", "").strip()
-            tax_rate = safe_find("2024 Tax Rate:")
+            improvement_value = parse_number(safe_find("Improvement Value:"))
+            land_value = parse_number(safe_find("Land Value:"))
+            personal_property_value = parse_number(safe_find("Personal Property Value:"))
+            taxable_property = parse_number(safe_find("Taxable Property:").replace("x", "").strip())
+            tax_rate = parse_number(safe_find(tax_rate_label(tax_year)))
 
             return {
                 "Parcel": parcel,
@@ -32,8 +54,9 @@ def scrape_details(link):
                 "Tax Rate": tax_rate,
             }
         else:
-            print(f"Failed to fetch details from {link}: HTTP {response.status_code}")
+            emit("error", link=link, status=response.status_code,
+                 message=f"Failed to fetch details from {link}: HTTP {response.status_code}")
             return {}
     except Exception as e:
-        print(f"Error fetching details from {link}: {e}")
+        emit("error", link=link, message=f"Error fetching details from {link}: {e}")
         return {}
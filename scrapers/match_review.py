@@ -0,0 +1,148 @@
+import csv
+import json
+import os
+import threading
+from rapidfuzz.fuzz import partial_ratio
+from termcolor import colored
+from utils.normalizer import normalize_text
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DECISIONS_PATH = os.getenv("SCRAPPY_DECISIONS_PATH", os.path.join(ROOT_FOLDER, "outputs", "match_decisions.json"))
+REVIEW_FILE_PATH = os.path.join(ROOT_FOLDER, "outputs", "review_queue.csv")
+
+# Marks a matched row whose fuzzy match is waiting for the end-of-run review
+REVIEW_MARKER = "_review"
+
+ACCEPT_WORDS = {"y", "yes", "accept", "a", "1", "true"}
+REJECT_WORDS = {"n", "no", "reject", "r", "0", "false"}
+
+
+def decision_key(input_name, matched_name):
+    """Key a decision on the normalized (input name, matched name) pair."""
+    return f"{normalize_text(input_name)}|{normalize_text(matched_name)}"
+
+
+class MatchDecisions:
+    """Accept/reject decisions for name pairs, persisted as JSON so they are reused across runs."""
+
+    def __init__(self, path=DECISIONS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._decisions = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as handle:
+                self._decisions = json.load(handle)
+
+    def get(self, input_name, matched_name):
+        """Return True/False for a decided pair, or None if it has never been reviewed."""
+        with self._lock:
+            return self._decisions.get(decision_key(input_name, matched_name))
+
+    def set_many(self, decisions):
+        """Record {(input_name, matched_name): bool} decisions and save them."""
+        with self._lock:
+            for (input_name, matched_name), accepted in decisions.items():
+                self._decisions[decision_key(input_name, matched_name)] = bool(accepted)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as handle:
+                json.dump(self._decisions, handle, indent=2, sort_keys=True)
+
+    def set(self, input_name, matched_name, accepted):
+        self.set_many({(input_name, matched_name): accepted})
+
+
+_decisions = None
+_decisions_lock = threading.Lock()
+
+
+def get_match_decisions():
+    """Return the process-wide decision store, loading it on first use."""
+    global _decisions
+    with _decisions_lock:
+        if _decisions is None:
+            _decisions = MatchDecisions()
+        return _decisions
+
+
+class ReviewQueue:
+    """Borderline matches collected while scraping, reviewed together once scraping finishes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []
+
+    def add(self, match, tax_year):
+        with self._lock:
+            self._pending.append((match, tax_year))
+
+    def __len__(self):
+        return len(self._pending)
+
+    def pairs(self):
+        """Return the distinct (input_name, matched_name) pairs waiting for review with their row counts."""
+        counts = {}
+        with self._lock:
+            for match, _ in self._pending:
+                pair = (match["Input Name"], match["Matched Name"])
+                counts[pair] = counts.get(pair, 0) + 1
+        return counts
+
+    def drain(self, decisions):
+        """Remove and return the queued (match, tax_year) entries whose pair was accepted."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        return [(match, tax_year) for match, tax_year in pending
+                if decisions.get((match["Input Name"], match["Matched Name"]))]
+
+
+def parse_selection(text, count):
+    """Parse '1,3-5', 'all' or '' into a set of 1-based indexes."""
+    text = text.strip().lower()
+    if text == "all":
+        return set(range(1, count + 1))
+    selected = set()
+    for part in filter(None, (piece.strip() for piece in text.split(","))):
+        start, _, end = part.partition("-")
+        selected.update(range(int(start), int(end or start) + 1))
+    return {index for index in selected if 1 <= index <= count}
+
+
+def review_cli(pairs):
+    """Show every pending pair in one table and ask once which to accept."""
+    ordered = sorted(pairs)
+    print("\n" + "=" * 40 + "\nMatches Awaiting Review\n" + "=" * 40)
+    for index, (input_name, matched_name) in enumerate(ordered, start=1):
+        score = partial_ratio(normalize_text(input_name), normalize_text(matched_name))
+        print(f"{index:>3}. {colored(input_name, 'yellow')} -> {colored(matched_name, 'yellow')} "
+              f"(score {score:.0f}, {pairs[(input_name, matched_name)]} properties)")
+    while True:
+        try:
+            selected = parse_selection(
+                input("Accept which matches? (e.g. 1,3-5, 'all', or Enter to reject all): "), len(ordered))
+            break
+        except ValueError:
+            print(colored("Invalid selection. Use numbers, ranges like 2-4, or 'all'.", "red"))
+    return {pair: index in selected for index, pair in enumerate(ordered, start=1)}
+
+
+def write_review_file(pairs, path=REVIEW_FILE_PATH):
+    """Write pending pairs to a CSV whose blank decision column can be filled in with y/n."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["decision", "input_name", "matched_name", "score", "properties"])
+        for (input_name, matched_name), count in sorted(pairs.items()):
+            score = partial_ratio(normalize_text(input_name), normalize_text(matched_name))
+            writer.writerow(["", input_name, matched_name, f"{score:.0f}", count])
+    return path
+
+
+def read_review_file(path):
+    """Read {(input_name, matched_name): bool} decisions from a filled-in review CSV."""
+    decisions = {}
+    with open(path, newline="", encoding="utf-8-sig") as handle:
+        for row in csv.DictReader(handle):
+            answer = (row.get("decision") or "").strip().lower()
+            if answer in ACCEPT_WORDS or answer in REJECT_WORDS:
+                decisions[(row["input_name"], row["matched_name"])] = answer in ACCEPT_WORDS
+    return decisions
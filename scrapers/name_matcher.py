@@ -0,0 +1,56 @@
+import os
+from functools import lru_cache
+from rapidfuzz import process
+from rapidfuzz.fuzz import partial_ratio
+from utils.normalizer import normalize_text
+
+MATCH_THRESHOLD = 80
+# rapidfuzz worker threads for large score matrices (-1 uses every core)
+MATCH_WORKERS = int(os.getenv("SCRAPPY_MATCH_WORKERS", "-1"))
+# Below this many cells a single thread is faster than starting workers
+PARALLEL_MIN_CELLS = 10000
+
+
+@lru_cache(maxsize=65536)
+def cached_normalize(text):
+    """Memoized normalize_text; owner names repeat heavily across pages and searches."""
+    return normalize_text(text)
+
+
+def threshold_hits(queries, choices, threshold=MATCH_THRESHOLD, workers=MATCH_WORKERS):
+    """Return the (query index, choice index) pairs whose partial_ratio score reaches `threshold`, row by row.
+
+    Uses a single rapidfuzz.process.cdist call when numpy is available and falls back
+    to one process.extract call per choice otherwise.
+    """
+    if not queries or not choices:
+        return []
+    if len(queries) * len(choices) < PARALLEL_MIN_CELLS:
+        workers = 1
+    try:
+        scores = process.cdist(queries, choices, scorer=partial_ratio, score_cutoff=threshold, workers=workers)
+        rows, columns = (scores >= threshold).nonzero()
+        return list(zip(rows.tolist(), columns.tolist()))
+    except ImportError:
+        hits = []
+        for column, choice in enumerate(choices):
+            for _, _, row in process.extract(choice, queries, scorer=partial_ratio, limit=None, score_cutoff=threshold):
+                hits.append((row, column))
+        return sorted(hits)
+
+
+def match_names(input_names, candidate_names, threshold=MATCH_THRESHOLD, workers=MATCH_WORKERS):
+    """Match a page's owner column against the searched input names in one batch.
+
+    Each name is normalized once. Returns one list per candidate of (input_name, exact)
+    pairs for every input that either normalizes to the same text (exact) or scores at
+    least `threshold` with partial_ratio (borderline, exact=False).
+    """
+    normalized_inputs = [cached_normalize(name) for name in input_names]
+    normalized_candidates = [cached_normalize(name or "") for name in candidate_names]
+
+    # Identical names always score 100, so exact matches are a subset of the threshold hits
+    matches = [[] for _ in candidate_names]
+    for row, column in threshold_hits(normalized_candidates, normalized_inputs, threshold, workers):
+        matches[row].append((input_names[column], normalized_candidates[row] == normalized_inputs[column]))
+    return matches
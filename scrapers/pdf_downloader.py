@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import nullcontext
+from urllib.parse import parse_qs, urlparse
+from utils import http_client
+from utils.metrics import timed
+from utils.refresh import refreshing
+
+# Bytes read from the network per write; large chunks keep per-chunk overhead low for big bills
+PDF_CHUNK_SIZE = int(os.getenv("SCRAPPY_PDF_CHUNK_KB", "256")) * 1024
+# Parallel PDF downloads (the per-host limiter still applies)
+PDF_WORKERS = int(os.getenv("SCRAPPY_PDF_WORKERS", "4"))
+# Anything smaller than this cannot be a real tax bill
+MIN_PDF_BYTES = int(os.getenv("SCRAPPY_MIN_PDF_BYTES", "64"))
+PDF_MAGIC = b"%PDF-"
+# Servers sometimes label PDFs generically, but never as HTML
+ACCEPTED_CONTENT_TYPES = ("application/pdf", "application/octet-stream", "binary/octet-stream", "application/x-pdf")
+
+OBJECTS_FOLDER_NAME = ".objects"
+# Temporary files are created private; stored objects are made readable like any saved file.
+# The mode is fixed rather than read from the umask, which can only be read by changing it
+# for the whole process
+OBJECT_MODE = 0o644
+INDEX_FILE_NAME = "bills.jsonl"
+
+
+class InvalidPdfError(Exception):
+    """Raised when a downloaded bill is not a PDF (an HTML error page, an empty body, a short read)."""
+
+
+def bill_id(link):
+    """Return the bill[] id of a PDF link, or None."""
+    if not link:
+        return None
+    values = parse_qs(urlparse(link).query).get("bill[]")
+    return values[0] if values else None
+
+
+def link_file(source, destination):
+    """Point `destination` at `source` with a hardlink, falling back to a symlink and then a copy.
+
+    The new name is built next to `destination` and renamed over it, so readers never see a partial file.
+    """
+    folder = os.path.dirname(destination)
+    temporary = os.path.join(folder, f".{os.path.basename(destination)}.{threading.get_ident()}.tmp")
+    if os.path.lexists(temporary):
+        os.remove(temporary)
+    try:
+        os.link(source, temporary)
+    except OSError:
+        try:
+            os.symlink(os.path.abspath(source), temporary)
+        except OSError:
+            with open(source, "rb") as reader, open(temporary, "wb") as writer:
+                while chunk := reader.read(PDF_CHUNK_SIZE):
+                    writer.write(chunk)
+    os.replace(temporary, destination)
+
+
+class PdfDownloader:
+    """Download bills into a SHA-256 content-addressed store under `folder`/.objects.
+
+    Each bill is streamed into a temporary file, checked (status, Content-Type, %PDF magic,
+    minimum size and Content-Length), then atomically renamed to its hash. The per-parcel
+    file in `folder` is a hardlink (or symlink) to that object, so identical bills are
+    stored once. Bills whose bill[] id was downloaded before are linked without a request,
+    except in a --refresh run (see utils.refresh).
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.objects_folder = os.path.join(folder, OBJECTS_FOLDER_NAME)
+        self.index_path = os.path.join(self.objects_folder, INDEX_FILE_NAME)
+        self.downloaded = 0
+        self.deduplicated = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+        self._bill_locks = {}
+        self._bills = {}
+        os.makedirs(self.objects_folder, exist_ok=True)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._bills[entry["bill"]] = entry["sha256"]
+        self._index = open(self.index_path, "a", encoding="utf-8")
+
+    def object_path(self, sha256):
+        return os.path.join(self.objects_folder, sha256[:2], f"{sha256}.pdf")
+
+    def _bill_lock(self, bill):
+        with self._lock:
+            return self._bill_locks.setdefault(bill, threading.Lock())
+
+    def download(self, link, path):
+        """Save the bill at `link` to `path`.
+
+        Returns {"path", "sha256", "size", "status"} where status is "downloaded",
+        "deduplicated" (same content as an earlier bill) or "present" (bill id already
+        stored, no request made). Raises InvalidPdfError or requests exceptions on failure.
+        """
+        bill = bill_id(link)
+        # Owners sharing a bill wait for the first download instead of fetching it again
+        with self._bill_lock(bill) if bill else nullcontext():
+            sha256 = self._bills.get(bill) if bill and not refreshing() else None
+            if sha256 and os.path.exists(self.object_path(sha256)):
+                link_file(self.object_path(sha256), path)
+                with self._lock:
+                    self.reused += 1
+                return {"path": path, "sha256": sha256, "size": os.path.getsize(self.object_path(sha256)),
+                        "status": "present"}
+
+            sha256, size, new = self._fetch(link)
+            link_file(self.object_path(sha256), path)
+            with self._lock:
+                if new:
+                    self.downloaded += 1
+                else:
+                    self.deduplicated += 1
+                if bill:
+                    self._bills[bill] = sha256
+                    self._index.write(json.dumps({"bill": bill, "sha256": sha256, "size": size}) + "\n")
+                    self._index.flush()
+        return {"path": path, "sha256": sha256, "size": size, "status": "downloaded" if new else "deduplicated"}
+
+    def _fetch(self, link):
+        """Stream a bill into a verified object; return (sha256, size, whether the object is new)."""
+        # Not passed through the response cache: it would buffer the whole body before the checks
+        # below, keep error pages as bills and store every PDF a second time
+        with timed("pdf_get") as timing, http_client.get(link, stream=True) as response:
+            if response.status_code != 200:
+                raise InvalidPdfError(f"HTTP {response.status_code}")
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if content_type and content_type not in ACCEPTED_CONTENT_TYPES:
+                raise InvalidPdfError(f"unexpected Content-Type {content_type!r}")
+
+            digest = hashlib.sha256()
+            size = 0
+            handle = tempfile.NamedTemporaryFile(dir=self.objects_folder, prefix=".download-", suffix=".tmp",
+                                                 delete=False)
+            try:
+                with handle:
+                    for chunk in response.iter_content(chunk_size=PDF_CHUNK_SIZE):
+                        if size == 0 and not chunk.startswith(PDF_MAGIC):
+                            raise InvalidPdfError("response does not start with %PDF")
+                        handle.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                expected = response.headers.get("Content-Length")
+                # Content-Length is the encoded size when the server compresses, so only check identity bodies
+                if expected and expected.isdigit() and not response.headers.get("Content-Encoding") and int(expected) != size:
+                    raise InvalidPdfError(f"short read: {size} of {expected} bytes")
+                if size < MIN_PDF_BYTES:
+                    raise InvalidPdfError(f"only {size} bytes")
+                timing["bytes"] = size
+
+                sha256 = digest.hexdigest()
+                destination = self.object_path(sha256)
+                if os.path.exists(destination):
+                    os.remove(handle.name)
+                    return sha256, size, False
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                os.chmod(handle.name, OBJECT_MODE)
+                os.replace(handle.name, destination)
+                return sha256, size, True
+            except BaseException:
+                if os.path.exists(handle.name):
+                    os.remove(handle.name)
+                raise
+
+    def summary(self):
+        return (f"{self.downloaded} downloaded, {self.deduplicated} identical to an earlier bill, "
+                f"{self.reused} already stored")
+
+    def close(self):
+        with self._lock:
+            self._index.close()
@@ -1,155 +1,388 @@
+import contextvars
+import threading
 import requests
-from bs4 import BeautifulSoup
-from rapidfuzz.fuzz import partial_ratio
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from utils.normalizer import normalize_text
-from termcolor import colored
-from locales import SUPPORTED_LOCALES  
-
-def confirm_match(input_name, matched_name, confirmed_matches, threshold=80):
-    """Confirm if the matched name is correct based on the input name."""
-    normalized_input = normalize_text(input_name)
-    normalized_matched = normalize_text(matched_name)
-
-    if normalized_input == normalized_matched:
-        return True
-
-    if partial_ratio(normalized_input, normalized_matched) >= threshold:
-        return confirm_user_input(input_name, matched_name, confirmed_matches)
-    
-    return False
-
-def confirm_user_input(input_name, matched_name, confirmed_matches):
-    """Prompt the user to confirm the match."""
-    if matched_name not in confirmed_matches:
-        while True:
-            response = input(f"Does '{input_name}' match '{matched_name}'? (y/n): ").strip().lower()
-            if response in ['y', 'n']:
-                confirmed_matches[matched_name] = response == 'y'
-                return confirmed_matches[matched_name]
-            print("Invalid input. Please enter 'y' for yes or 'n' for no.")
-    else:
-        return confirmed_matches[matched_name]
+from locales import SUPPORTED_LOCALES
+from utils import http_client
+from utils.fetch_engine import DEFAULT_MAX_WORKERS, DEFAULT_PREFETCH_DEPTH, PagePrefetcher
+from utils.checkpoint import search_page_key
+from utils.events import emit, flush_events
+from utils.metrics import get_metrics, timed
+from utils.property_record import PropertyRecord
+from scrapers.match_review import REVIEW_MARKER, ReviewQueue, get_match_decisions
+from scrapers.name_matcher import match_names
+from scrapers.query_planner import MERGE_PREFIX_SEARCHES, plan_searches, plan_summary
+from utils.html_parsing import extract_search_page, has_next_link
 
-def scrape_property_data(owner_names, locale, tax_year):
-    """Scrape property data for given owner names and locale."""
-    validate_locale(locale)
-    base_url = f"{SUPPORTED_LOCALES[locale]['url']}/mod.php?mod=propertytax&mode=public_lookup&action=&title="
-    results = []
-    session = requests.Session()
-    confirmed_matches = {}
+# Owner searches run on worker threads, so only one confirmation prompt may be on screen at a time
+_prompt_lock = threading.Lock()
 
-    for owner_name in owner_names:
-        scrape_owner_data(session, owner_name, base_url, tax_year, confirmed_matches, results, locale)
 
-    return results
+class SearchState:
+    """Match decisions and claimed accounts shared by every owner search in a run."""
+
+    def __init__(self, journal=None, fuzzy_policy="prompt", decisions=None, store=None, on_match=None):
+        self.journal = journal
+        self.store = store
+        # Called with each match as soon as it is added to an owner's results
+        self.on_match = on_match
+        self.fuzzy_policy = fuzzy_policy
+        self.decisions = decisions or get_match_decisions()
+        self.review_queue = ReviewQueue()
+        self.confirmed_matches = {}
+        # (owner_name, locale, tax_year, page, reason) for searches that stopped early
+        self.incomplete_searches = []
+        self._lock = threading.Lock()
+        self._claimed_accounts = set()
+
+    def claim_account(self, locale, tax_year, account):
+        """Return True if no other owner search has already returned this account."""
+        key = (locale, tax_year, account)
+        with self._lock:
+            if key in self._claimed_accounts:
+                return False
+            self._claimed_accounts.add(key)
+            return True
+
+    def search_incomplete(self, owner_name, locale, tax_year, page, reason):
+        """Record a search whose remaining pages could not be fetched."""
+        with self._lock:
+            self.incomplete_searches.append((owner_name, locale, tax_year, page, reason))
+
+def confirm_user_input(input_name, matched_name, confirmed_matches, policy="prompt", decisions=None):
+    """Settle a borderline match.
+
+    A decision saved by an earlier review always wins. Otherwise the match is deferred
+    (policy "defer"), settled by a fixed policy ("accept"/"reject"), or prompted for.
+    """
+    if decisions is not None:
+        known = decisions.get(input_name, matched_name)
+        if known is not None:
+            return known
+    if policy == "defer":
+        return None
+    if policy != "prompt":
+        return policy == "accept"
+
+    with _prompt_lock:
+        if matched_name not in confirmed_matches:
+            # Progress written in the background must not land in the middle of the prompt
+            flush_events()
+            while True:
+                response = input(f"Does '{input_name}' match '{matched_name}'? (y/n): ").strip().lower()
+                if response in ['y', 'n']:
+                    confirmed_matches[matched_name] = response == 'y'
+                    if decisions is not None:
+                        decisions.set(input_name, matched_name, confirmed_matches[matched_name])
+                    return confirmed_matches[matched_name]
+                print("Invalid input. Please enter 'y' for yes or 'n' for no.")
+        else:
+            return confirmed_matches[matched_name]
+
+def build_search_url(locale):
+    """Return the public lookup URL searched for a locale."""
+    return f"{SUPPORTED_LOCALES[locale]['url']}/mod.php?mod=propertytax&mode=public_lookup&action=&title="
+
+def iter_search_results(searches, max_workers=None, state=None, journal=None, fuzzy_policy="prompt", store=None,
+                        merge_prefixes=MERGE_PREFIX_SEARCHES):
+    """Run (owner_name, locale, tax_year) searches on one worker pool and yield (search, results) as each completes.
+
+    Equivalent searches are merged first (see plan_searches): each network search runs once
+    and its rows are handed back to every search it answers.
+    """
+    searches = list(dict.fromkeys(searches))
+    for _, locale, _ in searches:
+        validate_locale(locale)
+    session = http_client.get_session()
+    state = state or SearchState(journal, fuzzy_policy, store=store)
+    if not searches:
+        return
+
+    queries = plan_searches(searches, merge_prefixes)
+    get_metrics().incr("network_searches", len(queries))
+    get_metrics().incr("searches_merged", len(searches) - len(queries))
+    emit("search_plan", searches=len(searches), network_searches=len(queries),
+         saved=len(searches) - len(queries), message=plan_summary(searches, queries))
+
+    workers = max(1, min(max_workers or DEFAULT_MAX_WORKERS, len(queries)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            # Each search runs in a copy of this thread's context, so it reports to the same run
+            executor.submit(contextvars.copy_context().run, scrape_owner_data, session, query_name,
+                            build_search_url(locale), tax_year, state, locale,
+                            input_names=input_names): (locale, tax_year, input_names)
+            for query_name, locale, tax_year, input_names in queries
+        }
+        for future in as_completed(futures):
+            locale, tax_year, input_names = futures[future]
+            by_input = {owner_name: [] for owner_name in input_names}
+            for match in future.result():
+                by_input[match["Input Name"]].append(match)
+            for owner_name in input_names:
+                yield (owner_name, locale, tax_year), by_input[owner_name]
+
+def settle_review_queue(state, decisions, persist=True):
+    """Apply {(input_name, matched_name): bool} review decisions and return the accepted matches."""
+    if persist and decisions:
+        state.decisions.set_many(decisions)
+    accepted = []
+    for match, tax_year in state.review_queue.drain(decisions):
+        if not match["Account"] or state.claim_account(match["Locale"], tax_year, match["Account"]):
+            accepted.append(match)
+            if state.store:
+                state.store.upsert_match(match)
+    return accepted
+
+def scrape_property_data(owner_names, locale, tax_year, on_owner_complete=None, max_workers=None, journal=None,
+                         fuzzy_policy="prompt", store=None):
+    """Scrape property data for given owner names and locale.
+
+    Owners are searched concurrently; `on_owner_complete(owner_name, results)` is called
+    as each owner finishes. The combined results are returned in input-owner order.
+    Search pages already recorded in `journal` are replayed instead of fetched, and
+    matches are upserted into the property `store` if one is given.
+    """
+    validate_locale(locale)
+    searches = [(owner_name, locale, tax_year) for owner_name in owner_names]
+    search_results = {}
+    for search, results in iter_search_results(searches, max_workers=max_workers, journal=journal,
+                                               fuzzy_policy=fuzzy_policy, store=store):
+        search_results[search] = results
+        if on_owner_complete:
+            on_owner_complete(search[0], results)
+
+    ordered = []
+    for search in dict.fromkeys(searches):
+        ordered.extend(search_results.get(search, []))
+    return ordered
 
 def validate_locale(locale):
     """Check if the provided locale is supported."""
     if locale not in SUPPORTED_LOCALES:
         raise ValueError(f"Unsupported locale: {locale}")
 
-def scrape_owner_data(session, owner_name, base_url, tax_year, confirmed_matches, results, locale):
-    """Scrape data for each owner."""
+def fetch_search_page(session, base_url, owner_name, normalized_owner_name, tax_year, page, locale=None):
+    """POST one owner search page, emit page_fetched and return the response."""
+    payload = {
+        "selectMenu": "individual",
+        "tax_year": tax_year,
+        "owner_name": normalized_owner_name,
+        "page": page
+    }
+
+    with timed("search_post") as timing:
+        response = http_client.post(base_url, data=payload, session=session, resource="search")
+        timing["bytes"] = len(response.content)
+    emit("page_fetched", owner=owner_name, locale=locale, tax_year=tax_year, page=page,
+         status=response.status_code, bytes=timing["bytes"])
+    return response
+
+def scrape_owner_data(session, owner_name, base_url, tax_year, state, locale, prefetch_depth=DEFAULT_PREFETCH_DEPTH,
+                      input_names=None):
+    """Scrape data for each owner and return the matched properties.
+
+    Up to `prefetch_depth` result pages are requested ahead while the current one is parsed
+    and matched, each once the page before it shows a Next link; they are dropped as soon
+    as the search turns out to be finished.
+    Rows are matched against every name in `input_names` (default: just `owner_name`), and
+    each match's Input Name is the input it was matched to.
+    """
+    input_names = list(input_names or [owner_name])
+    emit("owner_started", owner=owner_name, locale=locale, tax_year=tax_year, input_names=input_names)
     normalized_owner_name = normalize_text(owner_name)
+    results = []
     seen_accounts = set()
+    pages = PagePrefetcher(
+        lambda number: fetch_search_page(session, base_url, owner_name, normalized_owner_name, tax_year, number,
+                                         locale),
+        lambda response: response.status_code == 200 and has_next_link(response.text),
+        prefetch_depth)
+    try:
+        scrape_owner_pages(pages, owner_name, tax_year, state, locale, results, seen_accounts, input_names)
+    finally:
+        pages.cancel()
+        get_metrics().incr("search_pages_prefetched", pages.prefetched)
+        get_metrics().incr("search_pages_prefetch_wasted", pages.wasted)
+    return results
+
+def scrape_owner_pages(pages, owner_name, tax_year, state, locale, results, seen_accounts, input_names=None):
+    """Walk an owner's result pages from `pages` (a PagePrefetcher), adding matches to `results`."""
     page = 1
 
     while True:
-        payload = {
-            "selectMenu": "individual",
-            "tax_year": tax_year,
-            "owner_name": normalized_owner_name,
-            "page": page
-        }
+        page_key = search_page_key(locale, tax_year, owner_name, page)
+        completed = state.journal.get("search_page", page_key) if state.journal else None
+        if completed:
+            emit("page_fetched", owner=owner_name, locale=locale, tax_year=tax_year, page=page, source="checkpoint")
+            for match in completed["matches"]:
+                add_match(PropertyRecord.from_dict(match), tax_year, state, results, seen_accounts)
+            if not completed["more"]:
+                break
+            page += 1
+            continue
 
-        print(f"Searching for owner: {owner_name}, Page: {page}")
         try:
-            response = session.post(base_url, data=payload)
-            if not handle_response(response, owner_name, page):
+            response = pages.get(page)
+            if not handle_response(response, owner_name, page, locale, tax_year):
+                state.search_incomplete(owner_name, locale, tax_year, page, f"HTTP {response.status_code}")
                 break
 
-            soup = BeautifulSoup(response.text, "html.parser")
-            table = soup.find("table", id="data")
-            if not table:
-                print(f"No table found on page {page} for {owner_name}. Stopping.")
-                break
+            page_matches = []
+            with timed("parse"):
+                search_page = extract_search_page(response.text, locale)
+            if not search_page["table"]:
+                emit("search_stopped", owner=owner_name, locale=locale, tax_year=tax_year, page=page, reason="no_table")
+                more = False
+            else:
+                more = process_table_rows(search_page, owner_name, state, page_matches, seen_accounts, locale, tax_year,
+                                          page, input_names)
 
-            if not process_table_rows(soup, table, owner_name, confirmed_matches, results, seen_accounts, locale):
+            if state.journal:
+                state.journal.record("search_page", page_key, matches=[match.to_dict() for match in page_matches],
+                                     more=more)
+            for match in page_matches:
+                add_match(match, tax_year, state, results, seen_accounts)
+            if not more:
                 break
 
             page += 1
         except requests.RequestException as e:
-            print(f"Error fetching data for {owner_name}, Page: {page}: {e}")
+            emit("error", owner=owner_name, locale=locale, tax_year=tax_year, page=page,
+                 message=f"Error fetching data for {owner_name}, Page: {page}: {e}")
+            state.search_incomplete(owner_name, locale, tax_year, page, str(e))
             break
 
-def handle_response(response, owner_name, page):
-    """Handle the HTTP response from the server."""
+def add_match(match, tax_year, state, results, seen_accounts):
+    """Add a matched row to the owner's results (and the property store) unless another owner already returned its account."""
+    account = match["Account"]
+    if account:
+        seen_accounts.add(account)
+    if match.pop(REVIEW_MARKER, False):
+        state.review_queue.add(match, tax_year)
+        emit("property_matched", input_name=match.get("Input Name"), matched_name=match.get("Matched Name"),
+             account=account, locale=match.get("Locale"), tax_year=tax_year, review=True)
+    elif not account or state.claim_account(match["Locale"], tax_year, account):
+        emit("property_matched", input_name=match.get("Input Name"), matched_name=match.get("Matched Name"),
+             account=account, locale=match.get("Locale"), tax_year=tax_year, review=False)
+        results.append(match)
+        if state.store:
+            state.store.upsert_match(match)
+        if state.on_match:
+            state.on_match(match)
+
+def handle_response(response, owner_name, page, locale=None, tax_year=None):
+    """Handle the HTTP response from the server, emitting an error event unless it is a 200."""
     if response.status_code == 500:
-        print(f"Server error (HTTP 500) for {owner_name}, Page: {page}. Retrying...")
+        # The shared client has already retried with exponential backoff by this point
+        emit("error", owner=owner_name, locale=locale, tax_year=tax_year, page=page, status=500,
+             message=f"Server error (HTTP 500) for {owner_name}, Page: {page} after {http_client.MAX_RETRIES} retries. "
+                     f"Remaining pages for this owner were not fetched; rerun with --resume to continue.")
         return False
 
     if response.status_code != 200:
-        print(f"Failed to fetch data for {owner_name}, Page: {page}: HTTP {response.status_code}")
+        emit("error", owner=owner_name, locale=locale, tax_year=tax_year, page=page, status=response.status_code,
+             message=f"Failed to fetch data for {owner_name}, Page: {page}: HTTP {response.status_code}")
         return False
 
     return True
 
-def process_table_rows(soup, table, owner_name, confirmed_matches, results, seen_accounts, locale):
-    """Process rows from the data table."""
-    rows = table.find_all("tr", class_="odd")
+def process_table_rows(search_page, owner_name, state, page_matches, seen_accounts, locale, tax_year=None, page=None,
+                       input_names=None):
+    """Process rows from the data table, matching the whole page's owner column against every input name in one batch."""
+    rows = search_page["rows"]
     if not rows:
-        print(f"No rows found for {owner_name}. Stopping.")
+        emit("search_stopped", owner=owner_name, locale=locale, tax_year=tax_year, page=page, reason="no_rows")
         return False
 
-    new_results = 0
+    parsed_rows = []
     for row in rows:
-        new_results += process_table_row(row, owner_name, confirmed_matches, results, seen_accounts, locale)
+        parsed = parse_table_row(row, locale, tax_year)
+        # Skip accounts this owner's search has already returned
+        if parsed and not (parsed["Account"] and parsed["Account"] in seen_accounts):
+            parsed_rows.append(parsed)
+
+    new_results = 0
+    with timed("match"):
+        row_matches = match_names(input_names or [owner_name], [parsed["Matched Name"] for parsed in parsed_rows])
+    for parsed, matches in zip(parsed_rows, row_matches):
+        new_results += process_table_row(parsed, matches, state, page_matches, seen_accounts)
 
-    pagination_element = soup.find("a", string="Next")
-    if not pagination_element or new_results == 0:
-        print(f"No new results or pagination end reached for {owner_name}. Stopping.")
+    if not search_page["next"] or new_results == 0:
+        emit("search_stopped", owner=owner_name, locale=locale, tax_year=tax_year, page=page, reason="last_page")
         return False
 
     return True
 
-def process_table_row(row, owner_name, confirmed_matches, results, seen_accounts, locale):
-    """Process a single row from the data table."""
-    cells = row.find_all("td")
-    if cells:
-        account = cells[3].text.strip() if len(cells) > 3 else None
-
-        # Ensure the account is unique
-        if account and account in seen_accounts:
-            return 0
-
-        owner = cells[1].text.strip() if len(cells) > 1 else None
-        address = cells[2].text.strip() if len(cells) > 2 else None
-        year = cells[4].text.strip() if len(cells) > 4 else None
-
-        # Get the last column (assumes the last column always contains the link)
-        last_cell = cells[-1]
-        link_suffix = last_cell.find("a")["href"] if last_cell.find("a") else None
-
-        full_link = f"{SUPPORTED_LOCALES[locale]['url']}/{link_suffix}" if link_suffix else None
-        id_value = link_suffix.split("id=")[1].split("&")[0] if link_suffix and "id=" in link_suffix else None
-        pdf_link = f"{SUPPORTED_LOCALES[locale]['url']}/mod.php?mod=propertytax&mode=PDFBill&viewtype=public&bill[]={id_value}&show_ocr=1" if id_value else None
-
-        # If there's a match, append it to results
-        if confirm_match(owner_name, owner, confirmed_matches):
-            results.append({
-                "Input Name": owner_name,
-                "Matched Name": owner,
-                "Address": address,
-                "Account": account,
-                "Year": year,
-                "Link": full_link,
-                "PDF Link": pdf_link,
-            })
-
-            # Add to seen accounts to avoid duplicates
-            if account:
-                seen_accounts.add(account)
-
-            return 1
-
-    return 0
+def parse_table_row(row, locale, tax_year=None):
+    """Build the PropertyRecord of a single extracted search result row, or None for rows without cells.
+
+    A row without a year column gets the searched `tax_year`.
+    """
+    cells = row["cells"]
+    if not cells:
+        return None
+
+    # Link from the last column (assumes the last column always contains the link)
+    link_suffix = row["link"]
+
+    full_link = f"{SUPPORTED_LOCALES[locale]['url']}/{link_suffix}" if link_suffix else None
+    id_value = link_suffix.split("id=")[1].split("&")[0] if link_suffix and "id=" in link_suffix else None
+    pdf_link = f"{SUPPORTED_LOCALES[locale]['url']}/mod.php?mod=propertytax&mode=PDFBill&viewtype=public&bill[]={id_value}&show_ocr=1" if id_value else None
+
+    record = PropertyRecord()
+    record.matched_name = cells[1] if len(cells) > 1 else None
+    record.address = cells[2] if len(cells) > 2 else None
+    record.account = cells[3] if len(cells) > 3 else None
+    record.year = (cells[4] if len(cells) > 4 else None) or tax_year
+    record.locale = locale
+    record.link = full_link
+    record.pdf_link = pdf_link
+    return record
+
+def process_table_row(parsed, matches, state, page_matches, seen_accounts):
+    """Record a parsed row if its owner matched an input name; return 1 if it counts as a new result.
+
+    `matches` are the row's (input_name, exact) pairs from match_names. The row goes to the
+    first input that takes it: exact matches first, then borderline ones in input order.
+    A row deferred for review is queued once for every borderline input that has not
+    rejected it, so rejecting one pair still leaves it to the others; the first accepted
+    candidate claims the account when the review is settled.
+    """
+    account = parsed["Account"]
+    # A row repeated on the same page has been handled already
+    if account and account in seen_accounts:
+        return 0
+
+    taken_by = None
+    deferred = []
+    for input_name, exact in sorted(matches, key=lambda pair: not pair[1]):
+        if exact:
+            decision = True
+        else:
+            decision = confirm_user_input(input_name, parsed["Matched Name"], state.confirmed_matches,
+                                          state.fuzzy_policy, state.decisions)
+        if decision:
+            taken_by = input_name
+            break
+        if decision is None:
+            deferred.append(input_name)
+
+    # If there's a match, append it to the page's matches; otherwise one review candidate per deferred input
+    if taken_by:
+        parsed.input_name = taken_by
+        page_matches.append(parsed)
+    else:
+        for index, input_name in enumerate(deferred):
+            candidate = parsed if index == 0 else PropertyRecord(parsed)
+            candidate.input_name = input_name
+            candidate[REVIEW_MARKER] = True
+            page_matches.append(candidate)
+    if not (taken_by or deferred):
+        return 0
+
+    # Add to seen accounts to avoid duplicates; accounts already returned
+    # for another owner still count as new for paging
+    if account:
+        seen_accounts.add(account)
+    return 1
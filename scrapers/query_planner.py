@@ -0,0 +1,50 @@
+import os
+from utils.normalizer import normalize_text
+
+# On a site whose owner search is a prefix search, a search for "Smith" also returns every
+# "Smith John" row, so longer names can ride along with a shorter one. Nothing checks that a
+# county searches this way, and merged names would silently get no rows where it does not,
+# so it is opt-in (--merge-prefix-searches)
+MERGE_PREFIX_SEARCHES = os.getenv("SCRAPPY_MERGE_PREFIX_SEARCHES", "").lower() in ("1", "true", "yes", "on")
+
+
+def plan_searches(searches, merge_prefixes=MERGE_PREFIX_SEARCHES):
+    """Group (owner_name, locale, tax_year) searches into the network searches that answer them.
+
+    The site is searched with the normalize_text form of a name, so names that normalize
+    to the same text (duplicates, case and spacing variants, "St"/"Street") are one search.
+    With `merge_prefixes`, a name whose words start with another searched name's words is
+    answered by that broader search too. Each row of a merged search is matched locally
+    against all of its input names.
+
+    Returns (query_name, locale, tax_year, input_names) tuples in the order of each
+    query's first search; query_name is the first input name of the broadest search.
+    """
+    groups = {}
+    for owner_name, locale, tax_year in dict.fromkeys(searches):
+        groups.setdefault((locale, tax_year, normalize_text(owner_name)), []).append(owner_name)
+
+    if merge_prefixes:
+        # Shortest names first, so each name folds into its broadest searched prefix
+        roots = {}
+        for group in sorted(groups, key=lambda group: len(group[2].split())):
+            locale, tax_year, key = group
+            words = key.split()
+            prefixes = ((locale, tax_year, " ".join(words[:length])) for length in range(1, len(words)))
+            root = next((prefix for prefix in prefixes if prefix in roots), None)
+            if root:
+                roots[root].append(group)
+            else:
+                roots[group] = []
+        for root, children in roots.items():
+            for child in children:
+                groups[root].extend(groups.pop(child))
+
+    return [(input_names[0], locale, tax_year, tuple(input_names))
+            for (locale, tax_year, _), input_names in groups.items()]
+
+
+def plan_summary(searches, queries):
+    """Return a one-line description of how many network searches a plan saves."""
+    count = len(dict.fromkeys(searches))
+    return f"{count} owner searches run as {len(queries)} network searches ({count - len(queries)} saved)"
@@ -0,0 +1,358 @@
+"""Resident worker service: run Scrappy jobs over local HTTP in one long-lived process.
+
+A fresh `main.py` process per job pays for interpreter start-up, imports, new HTTP
+connections and cold caches every time. The service keeps one process running, so the
+shared HTTP session and its connection pools, the HTTP cache, the property store, the
+match decisions, the name normalization cache and the per-host rate limiters all stay warm
+between jobs, and a job costs little more than its network time.
+
+Jobs run on a small pool of job threads fed by a queue. Each job writes its outputs,
+summary, metrics, checkpoint journal and error log to outputs/jobs/<id>/.
+
+Endpoints (JSON in and out):
+    POST /jobs                      {"owners": "Smith John;Doe Jane", "locales": "all", "tax_years": "2020-2024",
+                                     "fuzzy": "reject", "formats": "xlsx,csv", "extract_bills": false,
+                                     "refresh": false, "merge_prefix_searches": false}
+    GET  /jobs                      status of every job
+    GET  /jobs/<id>                 status of one job, with its run summary once it has finished
+    GET  /jobs/<id>/events?since=N  progress events as JSON lines, streamed until the job finishes
+    POST /jobs/<id>/decisions       {"decisions": [{"input_name": ..., "matched_name": ..., "accept": true}]}
+
+Borderline fuzzy matches raise a confirmation_required event. The job waits up to
+SCRAPPY_SERVICE_CONFIRM_TIMEOUT seconds for decisions, then settles the rest by the job's
+"fuzzy" policy. Decisions are saved like those from the review table.
+
+Usage: python main.py --serve [--port 8770] [--service-jobs 2]
+"""
+import contextlib
+import io
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from termcolor import colored
+
+ROOT_FOLDER = os.path.dirname(os.path.abspath(__file__))
+JOBS_FOLDER = os.path.join(ROOT_FOLDER, "outputs", "jobs")
+CONFIRM_TIMEOUT = float(os.getenv("SCRAPPY_SERVICE_CONFIRM_TIMEOUT", "300"))
+
+JOB_PATH = re.compile(r"^/jobs/([0-9a-f]+)(/events|/decisions)?/?$")
+
+
+def job_argv(spec, folder):
+    """Turn a job's JSON body into the command-line flags of a batch run writing to `folder`."""
+    def joined(key, separator):
+        value = spec.get(key)
+        if isinstance(value, (list, tuple)):
+            value = separator.join(str(item) for item in value)
+        return str(value) if value else None
+
+    owners = joined("owners", ";")
+    if not owners:
+        raise ValueError("A job needs at least one owner name.")
+    argv = ["--owners", owners,
+            "--output", os.path.join(folder, "output.xlsx"),
+            "--summary-json", os.path.join(folder, "summary.json"),
+            "--metrics-json", os.path.join(folder, "metrics.json"),
+            "--checkpoint", os.path.join(folder, "checkpoint.jsonl"),
+            "--error-log", os.path.join(folder, "errors.log")]
+    for key, flag, separator in [("locales", "--locale", ","), ("tax_years", "--tax-year", ","),
+                                 ("formats", "--format", ","), ("fuzzy", "--fuzzy", ",")]:
+        value = joined(key, separator)
+        if value:
+            argv += [flag, value]
+    if spec.get("workers"):
+        argv += ["--workers", str(spec["workers"])]
+    if spec.get("extract_bills"):
+        argv.append("--extract-bills")
+    if spec.get("refresh"):
+        argv.append("--refresh")
+    if spec.get("merge_prefix_searches"):
+        argv.append("--merge-prefix-searches")
+    return argv
+
+
+class Job:
+    """One queued search job, its progress events and any borderline matches awaiting decisions."""
+
+    def __init__(self, spec, args, folder):
+        self.id = os.path.basename(folder)
+        self.spec = spec
+        self.args = args
+        self.folder = folder
+        self.status = "queued"
+        self.exit_code = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.events = []
+        self.pending = {}
+        self.decisions = {}
+        self._condition = threading.Condition()
+        self.emit({"event": "queued"})
+
+    @property
+    def done(self):
+        return self.status in ("finished", "failed")
+
+    def emit(self, event):
+        """Append a progress event and wake the clients streaming this job's events."""
+        with self._condition:
+            event.setdefault("time", round(time.time(), 3))
+            event["job"] = self.id
+            self.events.append(event)
+            self._condition.notify_all()
+
+    def wait_for_events(self, since, timeout=15):
+        """Return the events after index `since`, waiting up to `timeout` seconds for new ones."""
+        with self._condition:
+            self._condition.wait_for(lambda: len(self.events) > since or self.done, timeout)
+            return self.events[since:]
+
+    def review(self, pairs):
+        """Ask the client about borderline (input_name, matched_name) pairs; return the decisions it sent.
+
+        Called by the run's review step, which settles pairs still undecided after
+        CONFIRM_TIMEOUT seconds by the job's fuzzy policy.
+        """
+        with self._condition:
+            self.pending = dict(pairs)
+        self.emit({"event": "confirmation_required", "timeout": CONFIRM_TIMEOUT, "pairs": [
+            {"input_name": input_name, "matched_name": matched_name, "properties": count}
+            for (input_name, matched_name), count in sorted(pairs.items())]})
+        with self._condition:
+            self._condition.wait_for(lambda: all(pair in self.decisions for pair in pairs), CONFIRM_TIMEOUT)
+            decided = {pair: self.decisions[pair] for pair in pairs if pair in self.decisions}
+            self.pending = {}
+        self.emit({"event": "confirmations_settled", "accepted": sum(decided.values()),
+                   "rejected": len(decided) - sum(decided.values()), "defaulted": len(pairs) - len(decided),
+                   "default": self.args.fuzzy})
+        return decided
+
+    def decide(self, decisions):
+        """Record client decisions for pending pairs; return (decisions applied, pairs still pending)."""
+        with self._condition:
+            applied = 0
+            for decision in decisions:
+                pair = (decision.get("input_name"), decision.get("matched_name"))
+                if pair in self.pending:
+                    self.decisions[pair] = bool(decision.get("accept"))
+                    applied += 1
+            self._condition.notify_all()
+            return applied, sum(1 for pair in self.pending if pair not in self.decisions)
+
+    def finish(self, status, exit_code=None, error=None):
+        summary = self.summary()
+        # Under the lock, so a streaming client never sees the job done without its last event
+        with self._condition:
+            self.status = status
+            self.exit_code = exit_code
+            self.error = error
+            self.finished = time.time()
+            self.emit({"event": status, "exit_code": exit_code, "error": error, "summary": summary})
+
+    def summary(self):
+        """Return the run summary the job wrote, or None."""
+        try:
+            with open(self.args.summary_json, encoding="utf-8") as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def to_dict(self, with_summary=False):
+        status = {
+            "id": self.id,
+            "status": self.status,
+            "exit_code": self.exit_code,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "elapsed_seconds": round((self.finished or time.time()) - self.started, 3) if self.started else None,
+            "events": len(self.events),
+            "pending_confirmations": len(self.pending),
+            "folder": self.folder,
+            "request": self.spec,
+        }
+        if with_summary:
+            status["summary"] = self.summary()
+        return status
+
+
+class ScrappyService:
+    """Queue jobs and run them on `jobs` threads with the process's shared, warm resources."""
+
+    def __init__(self, parse_args, run, jobs=2):
+        self.parse_args = parse_args
+        self.run = run
+        self.jobs = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._bill_extractor = None
+        self._threads = [threading.Thread(target=self._work, name=f"job-{index + 1}", daemon=True)
+                         for index in range(max(1, jobs))]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, spec):
+        """Validate and queue a job; raise ValueError with the reason if it is invalid."""
+        folder = os.path.join(JOBS_FOLDER, f"{time.strftime('%Y%m%d%H%M%S')}{uuid.uuid4().hex[:6]}")
+        argv = job_argv(spec, folder)
+        # argparse prints its reason to stderr and exits; return that reason to the client instead
+        stderr = io.StringIO()
+        try:
+            with contextlib.redirect_stderr(stderr):
+                args = self.parse_args(argv)
+        except SystemExit:
+            raise ValueError(stderr.getvalue().strip().splitlines()[-1].split(": error: ", 1)[-1]) from None
+        os.makedirs(folder, exist_ok=True)
+        job = Job(spec, args, folder)
+        with self._lock:
+            self.jobs[job.id] = job
+        self._queue.put(job)
+        print(f"Job {colored(job.id, 'cyan')} queued: {argv[1]}")
+        return job
+
+    def get_bill_extractor(self):
+        """Return the service's BillExtractor, so its worker processes stay up between jobs."""
+        with self._lock:
+            if self._bill_extractor is None:
+                from scrapers.bill_extractor import BillExtractor
+                from scrapers.pdf_downloader import OBJECTS_FOLDER_NAME
+                self._bill_extractor = BillExtractor(os.path.join(ROOT_FOLDER, "outputs", "pdfs", OBJECTS_FOLDER_NAME))
+            return self._bill_extractor
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            job.status = "running"
+            job.started = time.time()
+            job.emit({"event": "started"})
+            try:
+                extractor = self.get_bill_extractor() if job.args.extract_bills else None
+                exit_code = self.run(job.args, on_event=job.emit, reviewer=job.review, bill_extractor=extractor)
+                job.finish("finished", exit_code)
+            except SystemExit as e:
+                job.finish("failed", e.code if isinstance(e.code, int) else 1, f"Run exited: {e.code}")
+            except Exception as e:
+                job.finish("failed", 1, f"{type(e).__name__}: {e}")
+            print(f"Job {colored(job.id, 'cyan')} {job.status} in {job.finished - job.started:.1f}s")
+
+    def close(self):
+        """Stop taking jobs. Running jobs are abandoned and can be continued with --resume."""
+        for _ in self._threads:
+            self._queue.put(None)
+        running = any(job.status == "running" for job in self.jobs.values())
+        if self._bill_extractor and not running:
+            self._bill_extractor.close()
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") == "/jobs":
+            with self.service._lock:
+                jobs = list(self.service.jobs.values())
+            return self.send_json(200, {"jobs": [job.to_dict() for job in jobs]})
+        job, action = self.find_job(url.path)
+        if job is None:
+            return self.send_json(404, {"error": "No such job."})
+        if action == "/events":
+            since = int(parse_qs(url.query).get("since", ["0"])[0] or 0)
+            return self.stream_events(job, since)
+        if action is None:
+            return self.send_json(200, job.to_dict(with_summary=True))
+        self.send_json(405, {"error": "Use POST for decisions."})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        except ValueError:
+            return self.send_json(400, {"error": "The request body must be JSON."})
+        if url.path.rstrip("/") == "/jobs":
+            try:
+                job = self.service.submit(body)
+            except ValueError as e:
+                return self.send_json(400, {"error": str(e)})
+            return self.send_json(201, job.to_dict())
+        job, action = self.find_job(url.path)
+        if job is None:
+            return self.send_json(404, {"error": "No such job."})
+        if action != "/decisions":
+            return self.send_json(405, {"error": "Only decisions can be posted to a job."})
+        applied, pending = job.decide(body.get("decisions", []))
+        self.send_json(200, {"applied": applied, "pending": pending})
+
+    def find_job(self, path):
+        match = JOB_PATH.match(path)
+        if not match:
+            return None, None
+        with self.service._lock:
+            return self.service.jobs.get(match.group(1)), match.group(2)
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_events(self, job, since):
+        # No Content-Length: the stream ends when the job does and the connection closes
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while True:
+                events = job.wait_for_events(since)
+                if events:
+                    self.wfile.write("".join(json.dumps(event) + "\n" for event in events).encode())
+                    self.wfile.flush()
+                    since += len(events)
+                elif job.done:
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(parse_args, run, port=8770, jobs=2):
+    """Run the worker service on 127.0.0.1:`port` until interrupted; return the exit code."""
+    service = ScrappyService(parse_args, run, jobs)
+    handler = type("Handler", (ServiceHandler,), {"service": service})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    print(f"Scrappy worker service listening on {colored(f'http://127.0.0.1:{port}', 'green')} "
+          f"({len(service._threads)} concurrent jobs)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping the worker service...")
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    import main
+    sys.exit(serve(main.parse_args, main.run, port=int(os.getenv("SCRAPPY_SERVICE_PORT", "8770")),
+                   jobs=int(os.getenv("SCRAPPY_SERVICE_JOBS", "2"))))
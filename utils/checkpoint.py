@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import threading
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JOURNAL_PATH = os.getenv("SCRAPPY_JOURNAL_PATH", os.path.join(ROOT_FOLDER, "outputs", "checkpoint.jsonl"))
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def search_page_key(locale, tax_year, owner_name, page):
+    return f"{locale}|{tax_year}|{owner_name}|{page}"
+
+
+class CheckpointJournal:
+    """Append-only JSONL journal of completed search pages, detail scrapes and PDF downloads.
+
+    A fresh journal is started for every run; with `resume=True` the existing entries
+    are loaded first so completed work can be skipped. Work recorded during the run is
+    only appended to the file (the run params excepted), so memory stays flat on large runs.
+    """
+
+    def __init__(self, path=JOURNAL_PATH, resume=False):
+        self.path = path
+        self.resumed = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if resume and os.path.exists(path):
+            self._load()
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A run killed mid-write can leave a torn last line
+                    continue
+                self._entries[(entry["kind"], entry["key"])] = entry
+
+    def get(self, kind, key):
+        """Return the recorded entry for (kind, key), counting it as resumed work."""
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry is not None:
+                self.resumed += 1
+            return entry
+
+    def peek(self, kind, key):
+        """Return the recorded entry for (kind, key) without counting it."""
+        with self._lock:
+            return self._entries.get((kind, key))
+
+    def record(self, kind, key, **data):
+        """Append a completed unit of work and flush it to disk immediately."""
+        entry = dict(data, kind=kind, key=key)
+        line = json.dumps(entry)
+        with self._lock:
+            if kind == "run":
+                self._entries[(kind, key)] = entry
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def pdf_is_complete(self, key, path):
+        """Return True if `path` holds the PDF recorded for `key` with a matching size and hash."""
+        entry = self.peek("pdf", key)
+        if not entry or not os.path.exists(path):
+            return False
+        if os.path.getsize(path) != entry["size"] or file_sha256(path) != entry["sha256"]:
+            return False
+        with self._lock:
+            self.resumed += 1
+        return True
+
+    def close(self):
+        with self._lock:
+            self._file.close()
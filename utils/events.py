@@ -0,0 +1,196 @@
+import atexit
+import contextvars
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from termcolor import colored
+
+# JSONL file that receives every event (off unless set); quiet turns the terminal progress off
+EVENTS_PATH = os.getenv("SCRAPPY_EVENTS")
+QUIET = os.getenv("SCRAPPY_QUIET", "").lower() in ("1", "true", "yes", "on")
+
+
+def render_event(event):
+    """Return the terminal line(s) for an event, or None for events only written to the JSONL stream."""
+    kind = event["event"]
+    if kind == "page_fetched":
+        if event.get("source") == "checkpoint":
+            return f"Resuming owner: {event['owner']}, Page: {event['page']} from checkpoint"
+        return f"Searching for owner: {event['owner']}, Page: {event['page']}"
+    if kind == "search_stopped":
+        reason = event["reason"]
+        if reason == "no_table":
+            return f"No table found on page {event['page']} for {event['owner']}. Stopping."
+        if reason == "no_rows":
+            return f"No rows found for {event['owner']}. Stopping."
+        return f"No new results or pagination end reached for {event['owner']}. Stopping."
+    if kind == "search_plan":
+        return colored(event["message"], "cyan") if event["saved"] else None
+    if kind == "owner_finished":
+        return (f"Finished searching {colored(event['owner'], 'yellow')}: "
+                f"{colored(event['properties'], 'green')} properties found")
+    if kind == "pdf_saved":
+        label = f"PDF {event['position']} of {event['total']}" if event.get("total") else f"PDF {event['position']}"
+        status = event["status"]
+        if status == "downloaded":
+            return f"{label} " + colored("downloaded successfully", "green") + f": {event['path']}"
+        if status == "checkpoint":
+            return f"{label} already downloaded: {event['path']}"
+        if status == "unchanged":
+            return f"{label} unchanged since the last run: {event['path']}"
+        return f"{label} already stored ({status}): {event['path']}"
+    if kind == "output_written":
+        return f"Data written to {event['path']}"
+    if kind == "metrics_saved":
+        return f"Metrics report saved to: {colored(event['path'], 'green')}"
+    if kind == "error":
+        return colored(event["message"], "red")
+    if kind == "warning":
+        return event["message"]
+    if kind == "errors_logged":
+        if not event["errors"]:
+            return colored("No errors found!", "green", attrs=["bold"]) + \
+                "\n" + colored(f"\nErrors logged to: {event['path']}", "yellow")
+        lines = [colored("\n=== Errors Found ===", "red", attrs=["bold"])]
+        lines.extend(colored(f"Error: {error}", "red") for error in event["errors"])
+        lines.append(colored(f"\nTotal Errors: {len(event['errors'])}", "red"))
+        lines.append(colored(f"\nErrors logged to: {event['path']}", "yellow"))
+        return "\n".join(lines)
+    if kind == "log":
+        return "\n".join([
+            colored("\n=== Scraping Log ===", "cyan", attrs=["bold"]),
+            colored(f"Locale: {event['locale'].upper()} | Tax Year: {event['tax_year']}", "magenta"),
+            colored(f"Message: {event['message']}", "white", attrs=["bold"]),
+            colored("====================\n", "cyan", attrs=["bold"]),
+        ])
+    return None
+
+
+class EventStream:
+    """Structured progress events, written by a background thread so emitters never wait on I/O.
+
+    emit() only puts the event on a queue. The writer thread takes whatever has queued up,
+    appends it to the JSONL file at `path` in one write, and prints the rendered lines
+    (unless `quiet`) in one terminal write. Call flush() before printing or prompting
+    directly, so earlier progress lines appear first.
+    """
+
+    def __init__(self, path=None, quiet=False, render=render_event, stream=None):
+        self.path = path
+        self.quiet = quiet
+        self._render = render
+        self._stream = stream or sys.stdout
+        self._queue = queue.SimpleQueue()
+        self._file = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name="events", daemon=True)
+        self._thread.start()
+
+    def emit(self, event, **fields):
+        self._queue.put({"event": event, "time": time.time(), **fields})
+
+    def flush(self, timeout=5):
+        """Wait until every event emitted so far has been written."""
+        written = threading.Event()
+        self._queue.put(written)
+        written.wait(timeout)
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join(5)
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < 1000:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            events = [item for item in batch if isinstance(item, dict)]
+            if events:
+                self._write(events)
+            for item in batch:
+                if item is None:
+                    return
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _write(self, events):
+        try:
+            if self._file:
+                self._file.write("".join(json.dumps(event, default=str) + "\n" for event in events))
+                self._file.flush()
+            if not self.quiet:
+                lines = [line for line in map(self._render, events) if line is not None]
+                if lines:
+                    self._stream.write("\n".join(lines) + "\n")
+                    self._stream.flush()
+        except (OSError, ValueError) as e:
+            # A closed or broken stdout must not take the writer thread down with it
+            sys.stderr.write(f"Event stream write failed: {e}\n")
+
+
+_events = None
+_events_lock = threading.Lock()
+# Called with every event emitted by the run being worked on, e.g. a worker service job's progress
+_listener = contextvars.ContextVar("event_listener", default=None)
+
+
+def get_event_stream():
+    """Return the process-wide EventStream, starting it on first use."""
+    global _events
+    with _events_lock:
+        if _events is None:
+            _events = EventStream(EVENTS_PATH, QUIET)
+        return _events
+
+
+def configure_events(path=None, quiet=False):
+    """Replace the process-wide EventStream, e.g. with the --events and --quiet settings."""
+    global _events
+    with _events_lock:
+        previous, _events = _events, EventStream(path, quiet)
+    if previous:
+        previous.close()
+    return _events
+
+
+def emit(event, **fields):
+    """Emit a progress event on the process-wide stream, and to the current run's listener if it has one."""
+    (_events or get_event_stream()).emit(event, **fields)
+    listener = _listener.get()
+    if listener:
+        listener({"event": event, **fields})
+
+
+@contextmanager
+def listening(on_event):
+    """Pass every event emitted in the block (and the threads it starts for the run) to `on_event`."""
+    token = _listener.set(on_event)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+def flush_events():
+    """Write out pending events, if any were emitted."""
+    if _events:
+        _events.flush()
+
+
+@atexit.register
+def _close_events():
+    if _events:
+        _events.close()
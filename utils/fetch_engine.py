@@ -0,0 +1,307 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from utils.events import emit
+
+# Defaults can be overridden through the environment, like the other SCRAPPY_* settings
+DEFAULT_MAX_WORKERS = int(os.getenv("SCRAPPY_MAX_WORKERS", "8"))
+DEFAULT_HOST_CONCURRENCY = int(os.getenv("SCRAPPY_HOST_CONCURRENCY", "4"))
+DEFAULT_POLITENESS_DELAY = float(os.getenv("SCRAPPY_POLITENESS_DELAY", "0.1"))
+# Result pages requested ahead of the one being parsed; 0 fetches one page at a time
+DEFAULT_PREFETCH_DEPTH = int(os.getenv("SCRAPPY_PREFETCH_DEPTH", "2"))
+
+
+# Per-host throttle settings; any of them can be overridden per locale with a
+# "rate_limit" dict in SUPPORTED_LOCALES
+DEFAULT_HOST_SETTINGS = {
+    # Requests in flight at once
+    "concurrency": DEFAULT_HOST_CONCURRENCY,
+    # Token bucket: starting rate (requests/s), the range AIMD may move it in, and burst size
+    "rate": float(os.getenv("SCRAPPY_RATE_LIMIT", str(1 / DEFAULT_POLITENESS_DELAY if DEFAULT_POLITENESS_DELAY else 1000))),
+    "min_rate": float(os.getenv("SCRAPPY_MIN_RATE", "0.5")),
+    "max_rate": float(os.getenv("SCRAPPY_MAX_RATE", "0")) or None,
+    "burst": float(os.getenv("SCRAPPY_RATE_BURST", "1")),
+    # AIMD: add `increase` req/s after each fast success, multiply by `decrease` after an error
+    # or a response slower than `target_latency` seconds (at most once per second)
+    "increase": float(os.getenv("SCRAPPY_RATE_INCREASE", "0.1")),
+    "decrease": float(os.getenv("SCRAPPY_RATE_DECREASE", "0.5")),
+    "target_latency": float(os.getenv("SCRAPPY_TARGET_LATENCY", "5")),
+    # Circuit breaker: pause the host after this many consecutive failures, for `cooldown`
+    # seconds, doubling up to `max_cooldown` while probes keep failing
+    "failure_threshold": int(os.getenv("SCRAPPY_BREAKER_THRESHOLD", "5")),
+    "cooldown": float(os.getenv("SCRAPPY_BREAKER_COOLDOWN", "30")),
+    "max_cooldown": float(os.getenv("SCRAPPY_BREAKER_MAX_COOLDOWN", "300")),
+}
+
+
+def locale_host_settings(host):
+    """Return the "rate_limit" overrides of the locale served from `host`, if any."""
+    from locales import SUPPORTED_LOCALES
+    for locale in SUPPORTED_LOCALES.values():
+        if urlparse(locale.get("url", "")).netloc == host:
+            return locale.get("rate_limit", {})
+    return {}
+
+
+class HostThrottle:
+    """AIMD token bucket and circuit breaker for a single host.
+
+    The bucket refills at `rate` requests per second. Fast successes raise the rate
+    additively, while errors and slow responses cut it multiplicatively. After
+    `failure_threshold` consecutive failures the breaker opens and every request waits
+    out the cooldown; a single probe then decides whether the host is back.
+    """
+
+    def __init__(self, host, settings):
+        self.host = host
+        self.settings = settings
+        self.rate = settings["rate"]
+        self.max_rate = settings["max_rate"] or self.rate * 4
+        self.tokens = settings["burst"]
+        self.failures = 0
+        self.breaker_opens = 0
+        self.cooldown = settings["cooldown"]
+        self.open_until = 0.0
+        self.probing = False
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self.semaphore = threading.BoundedSemaphore(max(1, int(settings["concurrency"])))
+
+    def acquire(self):
+        """Block until the breaker lets requests through and a token is available.
+
+        Returns True if this request is the probe of a half-open breaker.
+        """
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if now < self.open_until:
+                    self._condition.wait(self.open_until - now)
+                    continue
+                probe = self.open_until > 0
+                if probe and self.probing:
+                    # Half open: wait for the probe's verdict
+                    self._condition.wait(1.0)
+                    continue
+                self.tokens = min(self.settings["burst"], self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.probing = probe
+                    return probe
+                self._condition.wait((1 - self.tokens) / self.rate)
+
+    def record(self, ok, latency, probe=False, pause=None):
+        """Adjust the rate and breaker after a request; `pause` is a server-requested delay in seconds.
+
+        The pause is capped at `max_cooldown`, so one Retry-After cannot stall a host for hours.
+        """
+        opened = False
+        with self._condition:
+            now = time.monotonic()
+            if ok:
+                self.failures = 0
+                if probe or self.open_until:
+                    self.open_until = 0.0
+                    self.cooldown = self.settings["cooldown"]
+                if latency <= self.settings["target_latency"]:
+                    self.rate = min(self.max_rate, self.rate + self.settings["increase"])
+                else:
+                    self._decrease(now)
+            else:
+                self.failures += 1
+                self._decrease(now)
+                if probe or self.failures >= self.settings["failure_threshold"] or pause:
+                    wait = max(min(pause or 0, self.settings["max_cooldown"]), self.cooldown)
+                    if probe:
+                        self.cooldown = min(self.settings["max_cooldown"], self.cooldown * 2)
+                    self.open_until = now + wait
+                    self.breaker_opens += 1
+                    opened = True
+            if probe:
+                self.probing = False
+            self._condition.notify_all()
+        if opened:
+            emit("warning", host=self.host, pause_seconds=round(wait, 1),
+                 message=f"Pausing requests to {self.host} for {wait:.0f}s after {self.failures} failed requests.")
+
+    def _decrease(self, now):
+        if now - self._last_decrease >= 1.0:
+            self.rate = max(self.settings["min_rate"], self.rate * self.settings["decrease"])
+            self._last_decrease = now
+
+
+class HostLimiter:
+    """Per-host adaptive throttles: bounded concurrency, an AIMD token bucket and a circuit breaker."""
+
+    def __init__(self, settings=None):
+        self.settings = dict(DEFAULT_HOST_SETTINGS, **(settings or {}))
+        self._lock = threading.Lock()
+        self._throttles = {}
+
+    def throttle(self, host):
+        with self._lock:
+            if host not in self._throttles:
+                self._throttles[host] = HostThrottle(host, dict(self.settings, **locale_host_settings(host)))
+            return self._throttles[host]
+
+    @contextmanager
+    def slot(self, url):
+        """Hold one of the host's request slots for the duration of the block.
+
+        The block should set `outcome["ok"]` (and optionally `outcome["pause"]`) to report
+        how the request went; an exception counts as a failure.
+        """
+        throttle = self.throttle(urlparse(url).netloc if url else "")
+        with throttle.semaphore:
+            probe = throttle.acquire()
+            outcome = {"ok": False, "pause": None}
+            started = time.monotonic()
+            try:
+                yield outcome
+            finally:
+                throttle.record(outcome["ok"], time.monotonic() - started, probe, outcome["pause"])
+
+    def summary(self):
+        """Return one line per host with its current rate and breaker activity."""
+        with self._lock:
+            throttles = list(self._throttles.values())
+        return [f"{throttle.host}: {throttle.rate:.1f} req/s, breaker opened {throttle.breaker_opens} times"
+                for throttle in throttles]
+
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_default_limiter():
+    """Return the process-wide HostLimiter so searches, detail pages and PDFs share per-host limits."""
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            _default_limiter = HostLimiter()
+        return _default_limiter
+
+
+_prefetch_pool = None
+_prefetch_pool_lock = threading.Lock()
+
+
+def get_prefetch_pool():
+    """Return the process-wide pool that fetches pages ahead; its threads only ever wait on requests."""
+    global _prefetch_pool
+    with _prefetch_pool_lock:
+        if _prefetch_pool is None:
+            _prefetch_pool = ThreadPoolExecutor(max_workers=DEFAULT_MAX_WORKERS, thread_name_prefix="prefetch")
+        return _prefetch_pool
+
+
+class PagePrefetcher:
+    """Fetch numbered pages ahead of the one being processed.
+
+    get(page) returns fetch(page). Once a page has arrived and `has_next(response)` says
+    another follows, that next page is fetched in the background, and so on up to `depth`
+    pages past the one being processed; a search whose first page is its last costs one
+    request. A page nobody has started on yet is fetched on the caller's thread, so
+    speculative work never delays the page actually needed. cancel() drops the pages
+    fetched ahead once the caller knows there are no more; requests already sent finish
+    and are counted in `wasted`.
+    """
+
+    def __init__(self, fetch, has_next, depth=DEFAULT_PREFETCH_DEPTH, pool=None):
+        self.fetch = fetch
+        self.has_next = has_next
+        self.depth = max(0, depth)
+        self.pool = pool
+        self.prefetched = 0
+        self.wasted = 0
+        self._futures = {}
+        self._current = 0
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        # Pages fetched ahead on the shared pool still count towards the caller's run
+        self._context = contextvars.copy_context()
+
+    def _fetch_ahead(self, page):
+        if self._cancelled.is_set():
+            return None
+        return self.fetch(page)
+
+    def _schedule_after(self, page, response):
+        """Start fetching page + 1 if `response` (page) links to it and it is within `depth` of the current page."""
+        if not self.depth or response is None or self._cancelled.is_set() or not self.has_next(response):
+            return
+        ahead = page + 1
+        with self._lock:
+            if ahead in self._futures or not self._current < ahead <= self._current + self.depth:
+                return
+            pool = self.pool or get_prefetch_pool()
+            future = self._futures[ahead] = pool.submit(self._context.copy().run, self._fetch_ahead, ahead)
+        future.add_done_callback(lambda done: self._on_fetched(ahead, done))
+
+    def _on_fetched(self, page, future):
+        if not future.cancelled() and future.exception() is None:
+            self._schedule_after(page, future.result())
+
+    def get(self, page):
+        with self._lock:
+            self._current = page
+            future = self._futures.pop(page, None)
+            # The furthest page fetched ahead may have arrived while it was outside the window
+            last = max(self._futures, default=None)
+            last_future = self._futures.get(last)
+        if last_future is not None and last_future.done():
+            self._on_fetched(last, last_future)
+        if future is None or future.cancel():
+            response = self.fetch(page)
+        else:
+            self.prefetched += 1
+            response = future.result()
+        self._schedule_after(page, response)
+        return response
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._lock:
+            futures, self._futures = list(self._futures.values()), {}
+        for future in futures:
+            if not future.cancel():
+                self.wasted += 1
+
+
+class Throughput:
+    """Thread-safe counters for pages and bytes fetched during a run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.finished = None
+        self.pages = 0
+        self.pdfs = 0
+        self.bytes = 0
+
+    def add(self, pages=0, pdfs=0, nbytes=0):
+        with self._lock:
+            self.pages += pages
+            self.pdfs += pdfs
+            self.bytes += nbytes or 0
+
+    def stop(self):
+        self.finished = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def summary(self):
+        """Return a one-line throughput report."""
+        elapsed = max(self.elapsed, 1e-9)
+        megabytes = self.bytes / (1024 * 1024)
+        return (f"{self.pages} detail pages and {self.pdfs} PDFs ({megabytes:.2f} MB) in {elapsed:.1f}s - "
+                f"{self.pages / elapsed:.2f} pages/s, {megabytes / elapsed:.2f} MB/s")
+
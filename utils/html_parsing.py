@@ -0,0 +1,113 @@
+import os
+import re
+from locales import SUPPORTED_LOCALES
+
+try:
+    import lxml.etree
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+DEFAULT_PARSER = os.getenv("SCRAPPY_HTML_PARSER") or ("lxml" if LXML_AVAILABLE else "html.parser")
+
+# When falling back to BeautifulSoup, build only the parts of the page we read
+SEARCH_PAGE_TAGS = ["table", "a"]
+DETAIL_PAGE_TAGS = "td"
+
+# The search page's pagination link, found without parsing the page
+NEXT_LINK_PATTERN = re.compile(r"<a\b[^>]*>\s*Next\s*</a>", re.IGNORECASE)
+
+
+def _soup(html, parser, tags):
+    """Parse only `tags` of `html` with BeautifulSoup, which is imported on first use to keep startup fast."""
+    from bs4 import BeautifulSoup, SoupStrainer
+    return BeautifulSoup(html, parser, parse_only=SoupStrainer(tags))
+
+
+def parser_for(locale=None):
+    """Return the parser for a locale ("parser" in SUPPORTED_LOCALES, else the default)."""
+    parser = SUPPORTED_LOCALES.get(locale, {}).get("parser", DEFAULT_PARSER) if locale else DEFAULT_PARSER
+    if parser == "lxml" and not LXML_AVAILABLE:
+        return "html.parser"
+    return parser
+
+
+def extract_search_page(html, locale=None):
+    """Pull the results out of a search page in one pass.
+
+    Returns {"table": bool, "rows": [...], "next": bool} where each row of `table#data`
+    with class "odd" is {"cells": [cell texts], "link": href of the last cell's first link or None}.
+    """
+    if parser_for(locale) == "lxml":
+        return _search_page_lxml(html)
+    return _search_page_soup(html, parser_for(locale))
+
+
+def _lxml_document(html):
+    """Parse `html` with lxml, or return None for a blank page, which lxml refuses to parse."""
+    try:
+        return lxml.html.document_fromstring(html)
+    except lxml.etree.ParserError:
+        return None
+
+
+def _search_page_lxml(html):
+    document = _lxml_document(html)
+    if document is None:
+        return {"table": False, "rows": [], "next": False}
+    tables = document.xpath('//table[@id="data"]')
+    rows = []
+    if tables:
+        for row in tables[0].xpath('.//tr[contains(concat(" ", normalize-space(@class), " "), " odd ")]'):
+            cells = list(row.iter("td"))
+            links = cells[-1].xpath(".//a") if cells else []
+            rows.append({
+                "cells": [cell.text_content().strip() for cell in cells],
+                "link": links[0].get("href") if links else None,
+            })
+    has_next = bool(document.xpath('//a[string(.)="Next"]'))
+    return {"table": bool(tables), "rows": rows, "next": has_next}
+
+
+def _search_page_soup(html, parser):
+    soup = _soup(html, parser, SEARCH_PAGE_TAGS)
+    table = soup.find("table", id="data")
+    rows = []
+    if table:
+        for row in table.find_all("tr", class_="odd"):
+            cells = row.find_all("td")
+            link = cells[-1].find("a") if cells else None
+            rows.append({"cells": [cell.text.strip() for cell in cells], "link": link.get("href") if link else None})
+    return {"table": table is not None, "rows": rows, "next": soup.find("a", string="Next") is not None}
+
+
+def has_next_link(html):
+    """Return whether a search page has a "Next" link; a quick check for prefetching, not a parse."""
+    return NEXT_LINK_PATTERN.search(html) is not None
+
+
+def extract_labeled_values(html, labels, locale=None):
+    """Map each label to the text of the cell after the first cell whose text is exactly that label.
+
+    Equivalent to soup.find("td", string=label).find_next("td") per label, but walks
+    the page's cells once. Labels that are not found are left out of the result.
+    """
+    use_lxml = parser_for(locale) == "lxml"
+    if use_lxml:
+        document = _lxml_document(html)
+        cells = list(document.iter("td")) if document is not None else []
+        cell_labels = [cell.text if len(cell) == 0 else None for cell in cells]
+    else:
+        cells = _soup(html, parser_for(locale), DETAIL_PAGE_TAGS).find_all("td")
+        cell_labels = [cell.string for cell in cells]
+
+    wanted = set(labels)
+    values = {}
+    for index, label in enumerate(cell_labels):
+        if label in wanted and label not in values and index + 1 < len(cells):
+            value_cell = cells[index + 1]
+            values[label] = (value_cell.text_content() if use_lxml else value_cell.text).strip()
+            if len(values) == len(wanted):
+                break
+    return values
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from utils.metrics import get_metrics
+from utils.refresh import refreshing
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.getenv("SCRAPPY_CACHE_PATH", os.path.join(ROOT_FOLDER, "outputs", "http_cache.sqlite"))
+CACHE_ENABLED = os.getenv("SCRAPPY_CACHE", "on").lower() not in ("off", "false", "0")
+CACHE_MAX_BYTES = int(float(os.getenv("SCRAPPY_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+# Seconds a cached response is served without asking the server again, per resource type
+RESOURCE_TTLS = {
+    "search": int(os.getenv("SCRAPPY_CACHE_TTL_SEARCH", str(6 * 3600))),
+    "detail": int(os.getenv("SCRAPPY_CACHE_TTL_DETAIL", str(24 * 3600))),
+}
+
+# Headers that describe the wire encoding rather than the cached (already decoded) body
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    resource TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    encoding TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+def cache_key(method, url, data=None):
+    """Build a stable key from the method, URL and (sorted) form payload."""
+    payload = urlencode(sorted(data.items()), doseq=True) if isinstance(data, dict) else (data or "")
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8", "replace")
+    return hashlib.sha256(f"{method.upper()} {url}\n{payload}".encode("utf-8")).hexdigest()
+
+
+def build_response(url, status, headers, encoding, body):
+    """Rebuild a requests Response from cached parts so callers cannot tell the difference."""
+    response = Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = encoding
+    response.url = url
+    response._content = body
+    response._content_consumed = True
+    return response
+
+
+class ResponseCache:
+    """SQLite-backed response cache with per-resource TTLs and size-bounded LRU eviction.
+
+    In a --refresh run (see utils.refresh), lookups find nothing, so every response is
+    fetched again and stored over the cached one.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES, ttls=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(RESOURCE_TTLS, **(ttls or {}))
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def lookup(self, key):
+        """Return the cached entry for `key` as a dict, or None."""
+        if refreshing():
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, resource, status, headers, encoding, body, etag, last_modified, stored_at "
+                "FROM responses WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        url, resource, status, headers, encoding, body, etag, last_modified, stored_at = row
+        return {
+            "url": url, "resource": resource, "status": status, "headers": json.loads(headers),
+            "encoding": encoding, "body": body, "etag": etag, "last_modified": last_modified,
+            "stored_at": stored_at,
+        }
+
+    def is_fresh(self, entry):
+        return time.time() - entry["stored_at"] < self.ttls.get(entry["resource"], 0)
+
+    def hit(self, key, entry, revalidated=False):
+        """Record a hit, mark the entry recently used and return it as a Response."""
+        now = time.time()
+        with self._lock:
+            if revalidated:
+                self.revalidated += 1
+                get_metrics().incr("cache_revalidated")
+                self._conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            else:
+                self.hits += 1
+                get_metrics().incr("cache_hits")
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return build_response(entry["url"], entry["status"], entry["headers"], entry["encoding"], entry["body"])
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+        get_metrics().incr("cache_misses")
+
+    def store(self, key, resource, response):
+        """Cache a successful response unless the server forbids it."""
+        if response.status_code != 200 or "no-store" in response.headers.get("Cache-Control", ""):
+            return
+        body = response.content
+        headers = {name: value for name, value in response.headers.items() if name.lower() not in _DROPPED_HEADERS}
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, url, resource, status, headers, encoding, body, size, etag, last_modified, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, response.url, resource, response.status_code, json.dumps(headers), response.encoding, body,
+                 len(body), response.headers.get("ETag"), response.headers.get("Last-Modified"), now, now))
+            self._total_bytes += len(body) - (previous[0] if previous else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in 90% of its budget."""
+        if self._total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            if self._total_bytes <= target:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._total_bytes -= size
+            self.evicted += 1
+
+    def summary(self):
+        """Return a one-line hit/miss report."""
+        lookups = self.hits + self.revalidated + self.misses
+        rate = (self.hits + self.revalidated) / lookups * 100 if lookups else 0.0
+        return (f"{self.hits} hits, {self.revalidated} revalidated, {self.misses} misses ({rate:.0f}% served from cache), "
+                f"{self.evicted} evicted, {self._total_bytes / (1024 * 1024):.1f} MB stored")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
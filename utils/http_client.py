@@ -0,0 +1,167 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.fetch_engine import DEFAULT_HOST_SETTINGS, DEFAULT_MAX_WORKERS, DEFAULT_HOST_CONCURRENCY, get_default_limiter
+from utils.http_cache import CACHE_ENABLED, ResponseCache, cache_key
+from utils.metrics import get_metrics
+from utils.startup import mark
+
+# Timeouts and retry policy, overridable through the environment
+CONNECT_TIMEOUT = float(os.getenv("SCRAPPY_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("SCRAPPY_READ_TIMEOUT", "60"))
+MAX_RETRIES = int(os.getenv("SCRAPPY_MAX_RETRIES", "5"))
+BACKOFF_FACTOR = float(os.getenv("SCRAPPY_BACKOFF_FACTOR", "0.5"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Statuses whose Retry-After header sets the wait before the next attempt
+RETRY_AFTER_STATUSES = (429, 503)
+# Longest Retry-After honoured; the same cap as the circuit breaker's longest pause
+MAX_RETRY_AFTER = DEFAULT_HOST_SETTINGS["max_cooldown"]
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Scrappy/1.0 (+https://github.com/IlliquidAsset/scrappy)",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+
+_session = None
+_session_lock = threading.Lock()
+_cache = None
+
+
+def build_session(pool_size=None, retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR):
+    """Create a keep-alive session whose connection pool and retry policy suit concurrent scraping."""
+    pool_size = pool_size or max(DEFAULT_MAX_WORKERS, DEFAULT_HOST_CONCURRENCY)
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        backoff_factor=backoff_factor,
+        # The search endpoint is a read-only POST, so it is safe to retry
+        allowed_methods=frozenset({"GET", "HEAD", "POST"}),
+        raise_on_status=False,
+        # Retry-After responses are retried by send(), where the limiter sees them
+        respect_retry_after_header=False,
+    )
+    # One pool per county host; each pool keeps enough idle connections for every worker
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session():
+    """Return the process-wide shared session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+
+def get_cache():
+    """Return the shared on-disk response cache, or None when caching is disabled."""
+    global _cache
+    with _session_lock:
+        if _cache is None and CACHE_ENABLED:
+            _cache = ResponseCache()
+        return _cache
+
+
+def retry_after_seconds(response):
+    """Return the Retry-After delay of a response in seconds (given as seconds or an HTTP date), or None."""
+    value = response.headers.get("Retry-After", "").strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_delay(response, attempt, backoff_factor=BACKOFF_FACTOR, max_retry_after=MAX_RETRY_AFTER):
+    """Return how long to wait before retrying `response`.
+
+    A Retry-After header on a 429 or 503 is honoured, up to `max_retry_after` seconds;
+    otherwise the wait is `backoff_factor * 2**attempt` with jitter, so workers that
+    failed together do not retry together.
+    """
+    if response.status_code in RETRY_AFTER_STATUSES:
+        retry_after = retry_after_seconds(response)
+        if retry_after is not None:
+            return min(retry_after, max_retry_after)
+    return backoff_factor * 2 ** attempt * random.uniform(0.5, 1.0)
+
+
+def send(session, method, url, **kwargs):
+    """Send a request through the per-host limiter, retrying server errors.
+
+    Connection and read errors are retried by the session. Responses with a status in
+    RETRY_STATUSES are retried here, up to MAX_RETRIES times, so the limiter sees every
+    attempt: it slows down, and it pauses the host once errors pile up, before the
+    request is tried again. Each retry first waits out retry_delay().
+    """
+    limiter = get_default_limiter()
+    for attempt in range(MAX_RETRIES + 1):
+        with limiter.slot(url) as outcome:
+            mark("first request sent")
+            response = session.request(method, url, **kwargs)
+            outcome["ok"] = response.status_code not in RETRY_STATUSES
+            outcome["pause"] = retry_after_seconds(response) \
+                if response.status_code in RETRY_AFTER_STATUSES else None
+        get_metrics().incr(f"http_{response.status_code}")
+        if outcome["ok"] or attempt == MAX_RETRIES:
+            return response
+        get_metrics().incr("http_retries")
+        response.close()
+        # Capped like the host's breaker pause, which may be overridden per locale
+        max_retry_after = limiter.throttle(urlparse(url).netloc).settings["max_cooldown"]
+        time.sleep(retry_delay(response, attempt, max_retry_after=max_retry_after))
+
+
+def request(method, url, session=None, timeout=None, resource=None, **kwargs):
+    """Send a request through the shared session with the default timeouts.
+
+    When `resource` names a cacheable resource type ("search" or "detail"),
+    fresh cached responses are returned without a round-trip and stale ones are
+    revalidated with If-None-Match / If-Modified-Since where the server supports it.
+    """
+    session = session or get_session()
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+    cache = get_cache() if resource else None
+    if cache is None:
+        return send(session, method, url, timeout=timeout, **kwargs)
+
+    key = cache_key(method, url, kwargs.get("data"))
+    entry = cache.lookup(key)
+    if entry and cache.is_fresh(entry):
+        return cache.hit(key, entry)
+
+    headers = dict(kwargs.pop("headers", None) or {})
+    if entry and entry["etag"]:
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry["last_modified"]:
+        headers["If-Modified-Since"] = entry["last_modified"]
+    response = send(session, method, url, timeout=timeout, headers=headers, **kwargs)
+    if response.status_code == 304 and entry:
+        response.close()
+        return cache.hit(key, entry, revalidated=True)
+
+    cache.miss()
+    cache.store(key, resource, response)
+    return response
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
@@ -0,0 +1,90 @@
+import csv
+import json
+import os
+
+DEFAULT_TAX_YEAR = "2024"
+
+
+def split_owner_names(value):
+    """Split a semicolon-separated owner list, dropping blanks."""
+    return [name.strip() for name in (value or "").split(";") if name.strip()]
+
+
+def split_locales(value, all_locales=()):
+    """Split a comma-separated locale list, expanding "all" to `all_locales` and dropping repeats."""
+    locales = []
+    for part in (value or "").split(","):
+        part = part.strip()
+        locales.extend(all_locales if part.lower() == "all" else [part] if part else [])
+    return list(dict.fromkeys(locales))
+
+
+def parse_tax_years(value):
+    """Parse tax years such as "2024", "2020-2024" or "2020-2022,2024" into a list of year strings.
+
+    Raises ValueError for anything that is not a year or an ascending year range.
+    """
+    years = []
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = (year.strip() for year in part.partition("-"))
+        if not (len(first) == 4 and first.isdigit()) or (last and not (len(last) == 4 and last.isdigit())):
+            raise ValueError(f"Invalid tax year {part!r}: use a year such as 2024 or a range such as 2020-2024.")
+        first, last = int(first), int(last or first)
+        if last < first:
+            raise ValueError(f"Invalid tax year range {part!r}: the first year must not be after the last.")
+        years.extend(str(year) for year in range(first, last + 1))
+    return list(dict.fromkeys(years))
+
+
+def load_jobs(path, default_locale=None, default_tax_year=DEFAULT_TAX_YEAR):
+    """Load jobs from a JSON or CSV job file.
+
+    JSON files hold a list of jobs (or {"jobs": [...]}), each with "locale", "tax_year"
+    and "owners" (a list or a semicolon-separated string). CSV files have one owner per
+    row with "owner_name", "locale" and "tax_year" columns. Missing locales and tax years
+    fall back to the given defaults. A job's locale may be a comma-separated list and its
+    tax year a range such as "2020-2024"; expand_jobs fans those out.
+    """
+    if os.path.splitext(path)[1].lower() == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as handle:
+            jobs = [
+                {"locale": row.get("locale"), "tax_year": row.get("tax_year"), "owners": [row.get("owner_name", "")]}
+                for row in csv.DictReader(handle)
+            ]
+    else:
+        with open(path, encoding="utf-8") as handle:
+            jobs = json.load(handle)
+        if isinstance(jobs, dict):
+            jobs = jobs.get("jobs", [jobs])
+
+    for job in jobs:
+        job["locale"] = (job.get("locale") or default_locale or "").strip()
+        job["tax_year"] = str(job.get("tax_year") or default_tax_year).strip()
+        owners = job.get("owners") or []
+        job["owners"] = split_owner_names(owners) if isinstance(owners, str) else [o.strip() for o in owners if o and o.strip()]
+    return jobs
+
+
+def expand_searches(owners, locales, tax_years):
+    """Return the (owner_name, locale, tax_year) searches for every combination.
+
+    Locales vary fastest, so neighbouring searches go to different county sites and
+    the per-host limits never leave the shared pool idle behind one slow host.
+    """
+    return [(owner_name, locale, tax_year) for tax_year in tax_years for owner_name in owners for locale in locales]
+
+
+def expand_jobs(jobs, all_locales=()):
+    """Flatten jobs into unique (owner_name, locale, tax_year) searches, keeping file order.
+
+    Raises ValueError if a job's tax year is not a year or year range.
+    """
+    searches = []
+    for job in jobs:
+        # A job without a locale still yields its searches, so the caller can report it
+        locales = split_locales(job["locale"], all_locales) or [""]
+        searches.extend(expand_searches(job["owners"], locales, parse_tax_years(job["tax_year"])))
+    return list(dict.fromkeys(searches))
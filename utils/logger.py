@@ -1,32 +1,39 @@
-from colorama import Fore, Style, init
+from colorama import init
+from utils.events import emit
 
 # Initialize colorama
 init(autoreset=True)
 
 def log_errors(data, file_path):
     """
-    Logs errors found in the data to a file and prints a summary to the console.
+    Logs errors found in the data to a file and reports a summary as an errors_logged event.
     """
-    errors = [item for item in data if "Error" in item]
-    if errors:
-        print(Fore.RED + Style.BRIGHT + "\n=== Errors Found ===")
-        for item in errors:
-            print(Fore.RED + f"Error: {item['Error']}")
-        print(Fore.RED + f"\nTotal Errors: {len(errors)}")
-    else:
-        print(Fore.GREEN + Style.BRIGHT + "No errors found!")
-
+    errors = [item["Error"] for item in data if "Error" in item]
     with open(file_path, "w") as file:
-        for item in errors:
-            file.write(f"{item['Error']}\n")
+        for error in errors:
+            file.write(f"{error}\n")
+
+    emit("errors_logged", path=file_path, errors=errors)
+
+class ErrorLogWriter:
+    """Streaming counterpart of log_errors: write errored items as they arrive and summarize on close()."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.errors = []
+        self._file = open(file_path, "w")
+
+    def append(self, item):
+        if "Error" in item:
+            self.errors.append(item["Error"])
+            self._file.write(f"{item['Error']}\n")
 
-    print(Fore.YELLOW + f"\nErrors logged to: {file_path}")
+    def close(self):
+        self._file.close()
+        emit("errors_logged", path=self.file_path, errors=self.errors)
 
 def log_scraping(locale, tax_year, message):
     """
-    Logs scraping events with improved formatting for CLI readability.
+    Logs scraping events as a log event, rendered as a banner for CLI readability.
     """
-    print(Fore.CYAN + Style.BRIGHT + "\n=== Scraping Log ===")
-    print(Fore.MAGENTA + f"Locale: {locale.upper()} | Tax Year: {tax_year}")
-    print(Fore.WHITE + Style.BRIGHT + f"Message: {message}")
-    print(Fore.CYAN + Style.BRIGHT + "====================\n")
+    emit("log", locale=locale, tax_year=tax_year, message=message)
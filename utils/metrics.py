@@ -0,0 +1,192 @@
+import cProfile
+import contextvars
+import json
+import math
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METRICS_PATH = os.getenv("SCRAPPY_METRICS_PATH", os.path.join(ROOT_FOLDER, "outputs", "metrics.json"))
+
+# Stages timed during a run, in the order they are reported
+STAGES = ["search_post", "detail_get", "pdf_get", "parse", "match", "write"]
+
+
+def percentile(ordered, fraction):
+    """Return the nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Histogram:
+    """Latency samples and byte totals for one stage."""
+
+    def __init__(self):
+        self.samples = []
+        self.bytes = 0
+
+    def report(self):
+        ordered = sorted(self.samples)
+        total = sum(ordered)
+        return {
+            "count": len(ordered),
+            "total_seconds": round(total, 6),
+            "mean_ms": round(total / len(ordered) * 1000, 3) if ordered else 0.0,
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+            "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+            "bytes": self.bytes,
+        }
+
+
+class Metrics:
+    """Thread-safe counters and per-stage latency histograms for one run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.counters = {}
+        self.histograms = {}
+
+    def incr(self, name, count=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + count
+
+    def observe(self, stage, seconds, nbytes=0):
+        """Record one timed operation of a stage and the bytes it transferred."""
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.samples.append(seconds)
+            histogram.bytes += nbytes or 0
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the block as one operation of `stage`; set `timing["bytes"]` inside it to record bytes."""
+        timing = {"bytes": 0}
+        started = time.perf_counter()
+        try:
+            yield timing
+        finally:
+            self.observe(stage, time.perf_counter() - started, timing["bytes"])
+
+    def report(self):
+        """Return the counters and stage histograms as a JSON-ready dict."""
+        with self._lock:
+            stages = {stage: histogram.report() for stage, histogram in self.histograms.items()}
+            counters = dict(sorted(self.counters.items()))
+        ordered = {stage: stages.pop(stage) for stage in STAGES if stage in stages}
+        ordered.update(sorted(stages.items()))
+        return {
+            "elapsed_seconds": round(time.monotonic() - self.started, 3),
+            "stages": ordered,
+            "counters": counters,
+            "bytes_transferred": sum(stage["bytes"] for stage in ordered.values()),
+        }
+
+    def summary_lines(self):
+        """Return one line per stage with its count, p50/p95 latency and bytes."""
+        lines = []
+        for stage, values in self.report()["stages"].items():
+            line = f"{stage}: {values['count']} calls, p50 {values['p50_ms']:.1f} ms, p95 {values['p95_ms']:.1f} ms"
+            if values["bytes"]:
+                line += f", {values['bytes'] / (1024 * 1024):.2f} MB"
+            lines.append(line)
+        return lines
+
+    def write(self, path=METRICS_PATH):
+        """Write the report to `path` and return it."""
+        report = self.report()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        return report
+
+
+_metrics = Metrics()
+# The registry of the run being worked on; threads started for a run carry it in a copied context
+_run_metrics = contextvars.ContextVar("run_metrics", default=None)
+
+
+def get_metrics():
+    """Return the current run's metrics registry (see run_metrics), or the process-wide one."""
+    return _run_metrics.get() or _metrics
+
+
+@contextmanager
+def run_metrics():
+    """Record the metrics of the block in a fresh Metrics, yielded to the caller.
+
+    Concurrent runs in one process (worker service jobs) each report only their own work.
+    """
+    metrics = Metrics()
+    token = _run_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _run_metrics.reset(token)
+
+
+def timed(stage):
+    """Shortcut for get_metrics().timer(stage)."""
+    return get_metrics().timer(stage)
+
+
+@contextmanager
+def profiled(path):
+    """Profile the block and save the result to `path`, yielding the path actually written.
+
+    An .html path is written with pyinstrument when it is installed; anything else is a
+    cProfile dump, covering the worker threads started inside the block as well, that
+    can be read with pstats or snakeviz.
+    """
+    if path.endswith(".html"):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            Profiler = None
+        if Profiler:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield path
+            finally:
+                profiler.stop()
+                with open(path, "w", encoding="utf-8") as handle:
+                    handle.write(profiler.output_html())
+            return
+        path = os.path.splitext(path)[0] + ".prof"
+        print(f"pyinstrument is not installed; writing a cProfile dump to {path} instead.")
+
+    profilers = []
+
+    def profile_thread(*_):
+        # Runs once in each thread started while profiling and hands the thread to its own profiler
+        sys.setprofile(None)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows only one active cProfile profiler per process
+            return
+        profilers.append(profiler)
+
+    main_profiler = cProfile.Profile()
+    main_profiler.enable()
+    threading.setprofile(profile_thread)
+    try:
+        yield path
+    finally:
+        threading.setprofile(None)
+        main_profiler.disable()
+        stats = pstats.Stats(main_profiler)
+        for profiler in profilers:
+            stats.add(profiler)
+        stats.dump_stats(path)
@@ -0,0 +1,79 @@
+import contextvars
+import os
+import queue
+import threading
+
+# Items waiting between two stages; producers block once a queue is full, so memory stays flat
+DEFAULT_QUEUE_SIZE = int(os.getenv("SCRAPPY_QUEUE_SIZE", "256"))
+
+# Marks the end of a stream
+DONE = object()
+
+
+class Stage:
+    """Apply `func` to every item of `inbox` on `workers` threads and put the results on `outbox`.
+
+    Results are passed on in completion order; None results are dropped. When DONE
+    arrives on `inbox` and every worker has finished, DONE is put on `outbox`. While
+    the stage is paused, workers finish their current item and then wait. Workers run in
+    a copy of the creating thread's context, so they report to the same run.
+    """
+
+    def __init__(self, func, inbox, outbox=None, workers=1, name="stage"):
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.name = name
+        self.error = None
+        self._running = threading.Event()
+        self._running.set()
+        self._lock = threading.Lock()
+        self._remaining = max(1, workers)
+        self._threads = [
+            threading.Thread(target=contextvars.copy_context().run, args=(self._work,), name=f"{name}-{index}",
+                             daemon=True)
+            for index in range(self._remaining)
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+        if self.error:
+            raise self.error
+
+    def _work(self):
+        while True:
+            item = self.inbox.get()
+            if item is DONE:
+                # Let the sibling workers see the end of the stream too
+                self.inbox.put(DONE)
+                break
+            self._running.wait()
+            try:
+                result = self.func(item)
+            except Exception as e:
+                # Keep draining so upstream stages never block on a full queue
+                self.error = self.error or e
+                continue
+            if result is not None and self.outbox is not None:
+                self.outbox.put(result)
+        with self._lock:
+            self._remaining -= 1
+            last = self._remaining == 0
+        if last and self.outbox is not None:
+            self.outbox.put(DONE)
+
+
+def bounded_queue(size=DEFAULT_QUEUE_SIZE):
+    return queue.Queue(maxsize=size)
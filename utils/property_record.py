@@ -0,0 +1,133 @@
+from collections.abc import MutableMapping
+
+# (output column, attribute) for every field a scraped property usually has
+FIELDS = [
+    ("Input Name", "input_name"),
+    ("Matched Name", "matched_name"),
+    ("Address", "address"),
+    ("Account", "account"),
+    ("Year", "year"),
+    ("Locale", "locale"),
+    ("Link", "link"),
+    ("PDF Link", "pdf_link"),
+    ("Parcel", "parcel"),
+    ("Improvement Value", "improvement_value"),
+    ("Land Value", "land_value"),
+    ("Personal Property Value", "personal_property_value"),
+    ("Assessment Rate", "assessment_rate"),
+    ("Tax Rate", "tax_rate"),
+]
+# Stored as floats (None when blank); text such as "$1,234" or "25% x" is parsed when it is set
+NUMBER_FIELDS = {"Improvement Value", "Land Value", "Personal Property Value", "Assessment Rate", "Tax Rate"}
+
+# Characters dropped before parsing a number, in one str.translate pass
+_NUMBER_NOISE = str.maketrans("", "", ",$%x")
+
+_ATTRIBUTES = dict(FIELDS)
+_NUMBER_ATTRIBUTES = {_ATTRIBUTES[key] for key in NUMBER_FIELDS}
+
+
+def parse_number(value):
+    """Parse scraped text like "$1,234", "25%" or "3.254" into a float; None when blank or not a number."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value.translate(_NUMBER_NOISE))
+    except (ValueError, AttributeError):
+        return None
+
+
+class PropertyRecord(MutableMapping):
+    """One scraped property, stored in slots instead of a per-row dict.
+
+    It reads and writes like the dicts it replaces (record["Matched Name"], get, update,
+    pop, "Error" in record), so writers and loggers need no changes. Keys outside FIELDS
+    go to a small dict that only exists when one is set. `position` is the property's
+    place in the run, assigned once when it enters the pipeline.
+    """
+
+    __slots__ = tuple(attribute for _, attribute in FIELDS) + ("position", "_extra")
+
+    def __init__(self, fields=None, **kwargs):
+        self.position = None
+        self._extra = None
+        if fields:
+            self.update(fields)
+        if kwargs:
+            self.update(kwargs)
+
+    def update(self, fields=(), **kwargs):
+        # Faster than MutableMapping.update, which goes through keys() and __getitem__ one by one
+        for key, value in fields.items() if hasattr(fields, "items") else fields:
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, fields):
+        return fields if isinstance(fields, cls) else cls(fields)
+
+    def __getitem__(self, key):
+        attribute = _ATTRIBUTES.get(key)
+        if attribute is None:
+            if self._extra is None:
+                raise KeyError(key)
+            return self._extra[key]
+        try:
+            return getattr(self, attribute)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        attribute = _ATTRIBUTES.get(key)
+        if attribute is None:
+            return self._extra.get(key, default) if self._extra else default
+        return getattr(self, attribute, default)
+
+    def __setitem__(self, key, value):
+        attribute = _ATTRIBUTES.get(key)
+        if attribute is None:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+        elif attribute in _NUMBER_ATTRIBUTES:
+            setattr(self, attribute, parse_number(value))
+        else:
+            setattr(self, attribute, value)
+
+    def __delitem__(self, key):
+        attribute = _ATTRIBUTES.get(key)
+        if attribute is None:
+            if self._extra is None:
+                raise KeyError(key)
+            del self._extra[key]
+            if not self._extra:
+                self._extra = None
+            return
+        try:
+            delattr(self, attribute)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        attribute = _ATTRIBUTES.get(key)
+        if attribute is None:
+            return self._extra is not None and key in self._extra
+        return hasattr(self, attribute)
+
+    def __iter__(self):
+        for key, attribute in FIELDS:
+            if hasattr(self, attribute):
+                yield key
+        if self._extra:
+            yield from list(self._extra)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def to_dict(self):
+        """Return the fields as a plain dict, e.g. for JSON."""
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"PropertyRecord({self.to_dict()!r})"
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from utils.metrics import get_metrics
+from utils.normalizer import normalize_text
+from utils.refresh import refreshing
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_PATH = os.getenv("SCRAPPY_STORE_PATH", os.path.join(ROOT_FOLDER, "outputs", "properties.sqlite"))
+STORE_ENABLED = os.getenv("SCRAPPY_STORE", "on").lower() not in ("off", "false", "0")
+
+# Fields of a search result row; when any of them changes the stored details are stale
+SEARCH_FIELDS = ["Matched Name", "Address", "Link", "PDF Link"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS properties (
+    locale TEXT NOT NULL,
+    account TEXT NOT NULL,
+    tax_year TEXT NOT NULL,
+    input_name TEXT,
+    matched_name TEXT,
+    owner_norm TEXT,
+    address TEXT,
+    address_norm TEXT,
+    parcel TEXT,
+    record TEXT NOT NULL,
+    search_hash TEXT NOT NULL,
+    details TEXT,
+    pdf_sha256 TEXT,
+    first_seen REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (locale, account, tax_year)
+);
+CREATE INDEX IF NOT EXISTS properties_owner_norm ON properties (owner_norm);
+CREATE INDEX IF NOT EXISTS properties_parcel ON properties (parcel);
+CREATE INDEX IF NOT EXISTS properties_address_norm ON properties (address_norm);
+"""
+
+
+def search_hash(match):
+    """Fingerprint the search-result fields of a match."""
+    payload = json.dumps([match.get(field) for field in SEARCH_FIELDS])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def store_key(property):
+    """Return the (locale, account, tax year) key of a property."""
+    return property.get("Locale"), property.get("Account"), property.get("Year") or ""
+
+
+def prefix_range(prefix):
+    """Return (low, high) bounds matching every string that starts with `prefix`, so the index can be used."""
+    return prefix, prefix + "\U0010ffff"
+
+
+class PropertyStore:
+    """SQLite store of scraped properties keyed by (locale, account, tax year).
+
+    Search results are upserted as owners are searched and details as properties are
+    processed. A property whose search row has not changed since its details were stored
+    is "unchanged" and its stored details can be reused instead of scraped again, unless
+    `skip_unchanged` is turned off or the run is a --refresh run (see utils.refresh).
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self.inserted = 0
+        self.updated = 0
+        self.reused = 0
+        self.skip_unchanged = True
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def upsert_match(self, match):
+        """Insert or refresh a search result. Stored details are dropped if the row changed."""
+        locale, account, tax_year = store_key(match)
+        if not account:
+            return
+        record = {key: value for key, value in match.items() if not key.startswith("_")}
+        now = time.time()
+        with self._lock:
+            existed = self._conn.execute(
+                "SELECT 1 FROM properties WHERE locale = ? AND account = ? AND tax_year = ?",
+                (locale, account, tax_year)).fetchone()
+            self._conn.execute(
+                "INSERT INTO properties (locale, account, tax_year, input_name, matched_name, owner_norm, address, "
+                "address_norm, record, search_hash, first_seen, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (locale, account, tax_year) DO UPDATE SET "
+                "input_name = excluded.input_name, matched_name = excluded.matched_name, owner_norm = excluded.owner_norm, "
+                "address = excluded.address, address_norm = excluded.address_norm, record = excluded.record, "
+                "details = CASE WHEN search_hash = excluded.search_hash THEN details END, "
+                "pdf_sha256 = CASE WHEN search_hash = excluded.search_hash THEN pdf_sha256 END, "
+                "search_hash = excluded.search_hash, updated_at = excluded.updated_at",
+                (locale, account, tax_year, match.get("Input Name"), match.get("Matched Name"),
+                 normalize_text(match.get("Matched Name")), match.get("Address"),
+                 normalize_text(match.get("Address")), json.dumps(record), search_hash(match), now, now))
+            self._conn.commit()
+            if existed:
+                self.updated += 1
+            else:
+                self.inserted += 1
+        get_metrics().incr("store_refreshed" if existed else "store_new")
+
+    def stored_details(self, property):
+        """Return (details, pdf_sha256) stored for an unchanged property, or (None, None)."""
+        locale, account, tax_year = store_key(property)
+        if not account or not self.skip_unchanged or refreshing():
+            return None, None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT details, pdf_sha256 FROM properties WHERE locale = ? AND account = ? AND tax_year = ? "
+                "AND search_hash = ? AND details IS NOT NULL",
+                (locale, account, tax_year, search_hash(property))).fetchone()
+            if not row:
+                return None, None
+            self.reused += 1
+        get_metrics().incr("store_unchanged_reused")
+        return json.loads(row[0]), row[1]
+
+    def upsert_details(self, property, details):
+        """Save the scraped details of a property."""
+        locale, account, tax_year = store_key(property)
+        if not account or not details:
+            return
+        with self._lock:
+            self._conn.execute(
+                "UPDATE properties SET details = ?, parcel = ?, updated_at = ? WHERE locale = ? AND account = ? AND tax_year = ?",
+                (json.dumps(details), details.get("Parcel"), time.time(), locale, account, tax_year))
+            self._conn.commit()
+
+    def upsert_pdf(self, property, pdf_sha256):
+        """Save the hash of a property's downloaded PDF."""
+        locale, account, tax_year = store_key(property)
+        if not account:
+            return
+        with self._lock:
+            self._conn.execute(
+                "UPDATE properties SET pdf_sha256 = ?, updated_at = ? WHERE locale = ? AND account = ? AND tax_year = ?",
+                (pdf_sha256, time.time(), locale, account, tax_year))
+            self._conn.commit()
+
+    def _select(self, where, params):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT record, details FROM properties WHERE {where} ORDER BY tax_year, locale, account",
+                params).fetchall()
+        return [dict(json.loads(record), **json.loads(details or "{}")) for record, details in rows]
+
+    def find_by_owner(self, owner_name):
+        """Return stored properties whose matched owner starts with `owner_name` (normalized), across all years."""
+        return self._select("owner_norm >= ? AND owner_norm < ?", prefix_range(normalize_text(owner_name)))
+
+    def find_by_parcel(self, parcel):
+        return self._select("parcel = ?", (parcel.strip(),))
+
+    def find_by_address(self, address):
+        """Return stored properties whose address starts with `address` (normalized)."""
+        return self._select("address_norm >= ? AND address_norm < ?", prefix_range(normalize_text(address)))
+
+    def summary(self):
+        """Return a one-line report of this run's writes and reuse."""
+        with self._lock:
+            total = self._conn.execute("SELECT COUNT(*) FROM properties").fetchone()[0]
+        return (f"{self.inserted} new, {self.updated} refreshed, {self.reused} unchanged reused, "
+                f"{total} properties stored")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_property_store():
+    """Return the shared property store, or None when the store is disabled."""
+    global _store
+    with _store_lock:
+        if _store is None and STORE_ENABLED:
+            _store = PropertyStore()
+        return _store
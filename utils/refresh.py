@@ -0,0 +1,21 @@
+import contextvars
+from contextlib import contextmanager
+
+# Whether the run being worked on was started with --refresh; threads started for a run
+# carry it in a copied context, like the run's metrics and event listener
+_refresh = contextvars.ContextVar("refresh", default=False)
+
+
+def refreshing():
+    """Return True if the current run fetches everything again instead of reusing earlier results."""
+    return _refresh.get()
+
+
+@contextmanager
+def refresh_run(refresh=True):
+    """Make the block (and the threads it starts for the run) ignore cached responses, saved bills and stored details."""
+    token = _refresh.set(refresh)
+    try:
+        yield
+    finally:
+        _refresh.reset(token)
@@ -0,0 +1,122 @@
+import importlib
+import sys
+import threading
+import time
+
+# Imported first by main.py, so this is as close to launch as Python code can measure
+STARTED = time.perf_counter()
+
+_milestones = {}
+_profiler = None
+
+
+def mark(label):
+    """Record the first time `label` is reached, in seconds since startup."""
+    if label not in _milestones:
+        _milestones[label] = time.perf_counter() - STARTED
+
+
+class ImportProfiler:
+    """A sys.meta_path hook that times how long each module takes to import.
+
+    Times are inclusive of the modules a module imports itself; `self` excludes them.
+    Imports made on other threads (such as preload) are reported with the thread's name.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def find_spec(self, name, path=None, target=None):
+        # Let the real finders locate the module, then wrap its loader
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, name, self)
+                return spec
+        return None
+
+    def report(self, limit=15):
+        """Return report lines for the `limit` slowest top-level imports."""
+        timings = sorted(self.timings.items(), key=lambda item: item[1][0], reverse=True)
+        lines = [f"{'total ms':>9} {'self ms':>8}  module"]
+        for name, (total, own, depth, thread) in timings:
+            if depth == 0 and len(lines) <= limit:
+                where = "" if thread == threading.main_thread().name else f" ({thread} thread)"
+                lines.append(f"{total * 1000:9.1f} {own * 1000:8.1f}  {name}{where}")
+        return lines
+
+
+class _TimedLoader:
+    def __init__(self, loader, name, profiler):
+        self._loader = loader
+        self._name = name
+        self._profiler = profiler
+
+    def __getattr__(self, attribute):
+        return getattr(self._loader, attribute)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        stack = self._profiler._stack
+        depth = len(stack)
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            # Code that inspects loaders should see the real one
+            module.__loader__ = self._loader
+            if getattr(module, "__spec__", None) is not None:
+                module.__spec__.loader = self._loader
+            total = time.perf_counter() - started
+            children = stack.pop()
+            if stack:
+                stack[-1] += total
+            with self._profiler._lock:
+                self._profiler.timings[self._name] = (total, total - children, depth,
+                                                      threading.current_thread().name)
+
+
+def start_import_profiler():
+    """Start timing every import from now on."""
+    global _profiler
+    if _profiler is None:
+        _profiler = ImportProfiler()
+        sys.meta_path.insert(0, _profiler)
+    return _profiler
+
+
+def startup_report():
+    """Return the milestone and import-time lines printed by --startup-profile."""
+    lines = [f"{label}: {seconds * 1000:.0f} ms after startup" for label, seconds in _milestones.items()]
+    if _profiler:
+        lines.append("Slowest imports:")
+        lines.extend(_profiler.report())
+    return lines
+
+
+def preload(modules):
+    """Import `modules` on a background thread, so later stages find them loaded."""
+    def load():
+        for module in modules:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                pass
+
+    thread = threading.Thread(target=load, name="preload", daemon=True)
+    thread.start()
+    return thread